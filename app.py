@@ -2,21 +2,39 @@
 #  app.py (Final Fixed Version)
 # ==========================
 
-from flask import Flask, jsonify, render_template, request
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
 from werkzeug.utils import secure_filename
+from concurrent.futures import TimeoutError as FutureTimeout
 import os
 
-# Import your project modules
-from seed_from_combined_csv import seed_all
-from main_scheduler import generate_schedule, run_dynamic_reoptimizer
-from database import init_db
+# Project modules (and through them pandas, scikit-learn, OR-Tools, SQLAlchemy)
+# are imported inside the routes that need them, so a worker serving only the
+# dashboard never pays for them. Set SCHEDULER_PREWARM=1 (e.g. with
+# gunicorn --preload) to load everything up front instead.
+HEAVY_MODULES = ("pandas", "sklearn", "ortools", "sqlalchemy")
 
 # ✅ 1. Create Flask app BEFORE using routes
 app = Flask(__name__, static_folder='static', template_folder='templates')
 
 UPLOAD_DIR = "uploads"
+REOPT_TIMEOUT = 120  # seconds a /api/reopt request waits for its batch
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
+def prewarm():
+    """Import the optimization stack and load the demand model ahead of the first request."""
+    import main_scheduler  # noqa: F401
+    import seed_from_combined_csv  # noqa: F401
+    from database import init_db
+    from prediction_engine import load_rf
+    init_db()
+    try:
+        load_rf()
+    except FileNotFoundError:
+        pass  # trained on first generate_schedule call
+
+if os.environ.get("SCHEDULER_PREWARM") == "1":
+    prewarm()
+
 # ✅ 2. Now define all your routes
 @app.route("/")
 def home():
@@ -24,21 +42,195 @@ def home():
 
 @app.route("/api/generate", methods=["POST"])
 def api_generate():
-    """Run the schedule generator."""
-    result = generate_schedule()
+    """
+    Run the schedule generator.
+    Body (optional): {"term": "Fall2025", "force_refresh": true} — term defaults to DEFAULT_TERM,
+    force_refresh bypasses the run cache.
+    """
+    from data_models import DEFAULT_TERM
+    from main_scheduler import generate_schedule
+    data = request.get_json(silent=True) or {}
+    result = generate_schedule(force_refresh=bool(data.get("force_refresh")), term=data.get("term") or DEFAULT_TERM)
     return jsonify({"status": "ok", "assigned": result})
 
 @app.route("/api/reopt", methods=["POST"])
 def api_reopt():
-    """Run re-optimizer for specific students."""
+    """
+    Queue seat-change events for batched re-optimization and wait for the result.
+    Body: {"events": [{"kind": "drop", "student_id": "S001", "course_id": "CSE 1110", "term": "Spring2025"}, ...]}
+    or the older {"affected_students": ["S001", ...]} (treated as eligibility changes).
+    """
+    from reopt_queue import ReoptEvent, get_queue
     data = request.get_json(force=True)
-    affected = data.get("affected_students", [])
-    result = run_dynamic_reoptimizer(affected)
+    events = [
+        ReoptEvent(e.get("kind", "eligibility_change"), e.get("student_id"), e.get("course_id"),
+                   e.get("term") or data.get("term"))
+        for e in data.get("events", [])
+    ]
+    events += [ReoptEvent("eligibility_change", sid, term=data.get("term"))
+               for sid in data.get("affected_students", [])]
+    if not events:
+        return jsonify({"status": "error", "message": "No events given"}), 400
+    try:
+        future = get_queue().submit(events)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    try:
+        result = future.result(timeout=REOPT_TIMEOUT)
+    except FutureTimeout:
+        # the batch keeps running in the worker; its assignments land in the DB when it finishes
+        return jsonify({"status": "pending",
+                        "message": f"Re-optimization still running after {REOPT_TIMEOUT}s"}), 202
     return jsonify({"status": "ok", "assigned": result})
 
+@app.route("/api/scenarios", methods=["POST"])
+def api_scenarios():
+    """
+    Evaluate what-if scenarios in parallel against the current data (DB is not modified).
+    Body: {"engine": "flow", "scenarios": [{"name": "extra C", "add_sections": [{"course_id": "CSE 1110", "code": "C"}]},
+                                           {"name": "room 401 +10", "room_capacity": {"401": 55}}]}
+    """
+    from data_models import DEFAULT_TERM
+    from database import SessionLocal, init_db
+    from main_scheduler import build_snapshot
+    from scenarios import ScenarioOverlay, evaluate_scenarios, validate_overlay
+    data = request.get_json(force=True)
+    init_db()
+    sess = SessionLocal()
+    try:
+        problem = build_snapshot(sess, seed=data.get("seed", 0), term=data.get("term") or DEFAULT_TERM)
+    finally:
+        sess.close()
+    try:
+        overlays = [ScenarioOverlay.from_dict(d) for d in data.get("scenarios", [])]
+        for o in overlays:
+            validate_overlay(problem, o)
+    except (ValueError, TypeError, AttributeError) as e:
+        return jsonify({"status": "error", "message": f"Invalid scenario: {e}"}), 400
+    results = evaluate_scenarios(problem, overlays, engine=data.get("engine", "flow"),
+                                 time_limit=float(data.get("time_limit", 5.0)))
+    return jsonify({"status": "ok", "scenarios": results})
+
+@app.route("/api/timetable", methods=["POST"])
+def api_timetable():
+    """
+    Assign day pattern, time slot and room to the term's sections (CP-SAT intervals).
+    Body: {"term": "Fall2025", "time_limit": 20, "fix_existing": true, "apply": false}
+    """
+    from data_models import DEFAULT_TERM
+    from database import SessionLocal, init_db
+    from timetable_solver import timetable_term
+    data = request.get_json(silent=True) or {}
+    init_db()
+    sess = SessionLocal()
+    try:
+        placements, stats = timetable_term(sess, data.get("term") or DEFAULT_TERM, apply=bool(data.get("apply")),
+                                           fix_existing=bool(data.get("fix_existing")),
+                                           time_limit=float(data.get("time_limit", 10.0)))
+    finally:
+        sess.close()
+    return jsonify({"status": "ok", "stats": stats, "sections": placements})
+
+@app.route("/api/students/<student_id>/assignment", methods=["GET"])
+def api_student_assignment(student_id):
+    """A registrant's current seat. Query: ?term=<term> (default DEFAULT_TERM)"""
+    from data_models import DEFAULT_TERM, Assignment, Section, Student
+    from database import SessionLocal
+    term = request.args.get("term") or DEFAULT_TERM
+    sess = SessionLocal()
+    try:
+        row = (
+            sess.query(Assignment.status, Section.id, Section.course_id, Section.code, Section.day,
+                       Section.start_time, Section.end_time, Section.room)
+            .join(Student, Student.id == Assignment.student_id)
+            .outerjoin(Section, Section.id == Assignment.section_id)
+            .filter(Student.student_id == student_id, Assignment.term == term)
+            .order_by(Assignment.id.desc())
+            .first()
+        )
+    finally:
+        sess.close()
+    if row is None:
+        return jsonify({"status": "not_assigned", "student_id": student_id, "term": term}), 404
+    keys = ("status", "section_id", "course_id", "code", "day", "start_time", "end_time", "room")
+    return jsonify({"student_id": student_id, "term": term, **dict(zip(keys, row))})
+
+@app.route("/api/reserve", methods=["POST"])
+def api_reserve():
+    """Claim an open seat directly (no optimizer). Body: {"student_id": "S001", "section_id": 12}"""
+    from database import SessionLocal
+    from seat_reservation import reserve_seat
+    data = request.get_json(force=True)
+    sess = SessionLocal()
+    try:
+        result = reserve_seat(sess, data.get("student_id"), data.get("section_id"))
+    finally:
+        sess.close()
+    code = 200 if result["status"] == "reserved" else 404 if result["status"] == "not_found" else 409
+    return jsonify(result), code
+
+@app.route("/api/release", methods=["POST"])
+def api_release():
+    """Give up the student's current seat in a term. Body: {"student_id": "S001", "term": "Spring2025"}"""
+    from data_models import DEFAULT_TERM
+    from database import SessionLocal
+    from seat_reservation import release_seat
+    data = request.get_json(force=True)
+    sess = SessionLocal()
+    try:
+        result = release_seat(sess, data.get("student_id"), term=data.get("term") or DEFAULT_TERM)
+    finally:
+        sess.close()
+    code = 200 if result["status"] == "released" else 404 if result["status"] == "not_found" else 409
+    return jsonify(result), code
+
+@app.route("/api/metrics/models", methods=["GET"])
+def api_model_metrics():
+    """Size and load time of the model artifacts loaded by this worker."""
+    from model_registry import model_metrics
+    return jsonify({"status": "ok", "models": model_metrics()})
+
+@app.route("/api/export/schedule.<fmt>", methods=["GET"])
+def api_export(fmt):
+    """
+    Stream the schedule as CSV or Parquet.
+    Query: ?run_id=<id> (one stored run; default current schedule), ?order=student|section,
+           ?term=<term> (default: every term)
+    """
+    import export_schedule as ex
+    run_id = request.args.get("run_id", type=int)
+    term = request.args.get("term")
+    order = request.args.get("order", "student")
+    if order not in ex.EXPORT_ORDERS:
+        return jsonify({"status": "error", "message": f"order must be one of {ex.EXPORT_ORDERS}"}), 400
+    if fmt == "csv":
+        stream, mimetype = ex.stream_csv, "text/csv"
+    elif fmt == "parquet":
+        try:
+            ex._require_pyarrow()
+        except RuntimeError as e:
+            return jsonify({"status": "error", "message": str(e)}), 501
+        stream, mimetype = ex.stream_parquet, "application/vnd.apache.parquet"
+    else:
+        return jsonify({"status": "error", "message": "format must be csv or parquet"}), 404
+
+    def generate():
+        from database import SessionLocal, init_db
+        init_db()
+        sess = SessionLocal()
+        try:
+            yield from stream(sess, run_id, order, term=term)
+        finally:
+            sess.close()
+
+    return Response(stream_with_context(generate()), mimetype=mimetype,
+                    headers={"Content-Disposition": f"attachment; filename=schedule.{fmt}"})
+
 @app.route("/admin/upload-csv", methods=["POST"])
 def upload_csv():
     """Upload and seed CSV files into the database."""
+    from data_models import DEFAULT_TERM
+    from seed_from_combined_csv import seed_all
     saved = {}
     for key in ["students", "courses", "sections", "prefs"]:
         file = request.files.get(key)
@@ -50,15 +242,17 @@ def upload_csv():
     if not saved:
         return jsonify({"status": "error", "message": "No files uploaded"}), 400
 
-    seed_all(
+    violations = seed_all(
         students_csv=saved.get("students"),
         courses_csv=saved.get("courses"),
         sections_csv=saved.get("sections"),
         prefs_csv=saved.get("prefs"),
+        term=request.form.get("term") or DEFAULT_TERM,
     )
-    return jsonify({"status": "ok", "seeded_files": list(saved.keys())})
+    return jsonify({"status": "ok", "seeded_files": list(saved.keys()), "violations": violations})
 
 # ✅ 3. Finally, run the Flask app
 if __name__ == "__main__":
+    from database import init_db
     init_db()
     app.run(debug=True)
@@ -0,0 +1,45 @@
+# check_startup.py
+"""
+Import-time budget check for the Flask app.
+
+Imports app.py in a fresh interpreter and fails if it takes longer than the
+budget or drags in any of the heavy optimization modules. Run it in CI or
+before a deploy:
+    python check_startup.py --budget-ms 500
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import app
+elapsed = time.perf_counter() - t0
+heavy = sorted(m for m in app.HEAVY_MODULES if m in sys.modules)
+print(json.dumps({"import_ms": elapsed * 1000, "heavy_loaded": heavy}))
+"""
+
+
+def measure_startup() -> dict:
+    out = subprocess.run([sys.executable, "-c", PROBE], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def check_startup(budget_ms: float = 500.0) -> bool:
+    result = measure_startup()
+    ok = result["import_ms"] <= budget_ms and not result["heavy_loaded"]
+    mark = "✅" if ok else "❌"
+    print(f"{mark} import app: {result['import_ms']:.0f} ms (budget {budget_ms:.0f} ms)")
+    if result["heavy_loaded"]:
+        print(f"❌ heavy modules loaded at import: {', '.join(result['heavy_loaded'])}")
+    return ok
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--budget-ms", type=float, default=500.0)
+    args = ap.parse_args()
+    sys.exit(0 if check_startup(args.budget_ms) else 1)
@@ -1,18 +1,19 @@
 # constraint_solver.py
 from typing import List, Dict
+from collections import defaultdict
 from ortools.sat.python import cp_model
 from data_models import Section
+from timetable_index import overlaps, build_slot_index, find_clashes, room_key  # noqa: F401 (overlaps re-exported)
 
-# Simple time overlap checker
-def overlaps(s1, s2) -> bool:
-    if s1.day != s2.day: return False
-    return not (s1.end_time <= s2.start_time or s2.end_time <= s1.start_time)
-
-def cp_refine_schedule(students, sections, initial_assignments):
+def cp_refine_schedule(students, sections, initial_assignments, faculty=None, seed=None, time_limit=10.0):
     """
     students: list of Student
     sections: list of Section
     initial_assignments: dict {student_id: section_id or None}
+    faculty: optional list of Faculty (id, max_load, available); enables
+             faculty-load and availability limits on which sections may run
+    seed: if given, solve deterministically (single worker, fixed random seed,
+          deterministic time budget) so a seeded run can be replayed exactly
     Returns: dict repaired assignments
     """
     model = cp_model.CpModel()
@@ -27,15 +28,32 @@ def cp_refine_schedule(students, sections, initial_assignments):
     for stu in students:
         model.Add(sum(x[stu.student_id][sec.id] for sec in sections) <= 1)
 
-    # 2) Capacity
+    # 2) Capacity — a section only takes students if it runs (open)
+    is_open = {sec.id: model.NewBoolVar(f"open_{sec.id}") for sec in sections}
     for sec in sections:
-        model.Add(sum(x[stu.student_id][sec.id] for stu in students) <= sec.capacity)
+        model.Add(sum(x[stu.student_id][sec.id] for stu in students) <= sec.capacity * is_open[sec.id])
 
     # 3) Faculty availability (faculty_id may be None → treat as unavailable)
+    fac_by_id = {f.id: f for f in (faculty or [])}
+    for sec in sections:
+        fac = fac_by_id.get(sec.faculty_id)
+        if sec.faculty_id is None or (fac is not None and not fac.available):
+            model.Add(is_open[sec.id] == 0)
+
+    # 3b) Faculty max load: open sections per faculty ≤ max_load
+    by_faculty = defaultdict(list)
     for sec in sections:
-        if sec.faculty_id is None:
-            for stu in students:
-                model.Add(x[stu.student_id][sec.id] == 0)
+        if sec.faculty_id in fac_by_id:
+            by_faculty[sec.faculty_id].append(is_open[sec.id])
+    for fid, opens in by_faculty.items():
+        max_load = fac_by_id[fid].max_load
+        if max_load is not None and len(opens) > max_load:
+            model.Add(sum(opens) <= max_load)
+
+    # 3c) Room clashes: two overlapping sections in one room cannot both run.
+    #     Pairs come from the room → slot index (sweep), not a pairwise scan.
+    for a, b, _room, _day in find_clashes(build_slot_index(sections, room_key)):
+        model.AddBoolOr([is_open[a].Not(), is_open[b].Not()])
 
     # 4) No time conflicts per student (single-course example keeps simple;
     #    multi-course would compare chosen sections pairwise)
@@ -49,7 +67,14 @@ def cp_refine_schedule(students, sections, initial_assignments):
     model.Maximize(sum(terms))
 
     solver = cp_model.CpSolver()
-    solver.parameters.max_time_in_seconds = 10.0
+    solver.parameters.max_time_in_seconds = time_limit
+    if seed is not None:
+        solver.parameters.random_seed = int(seed) % (2**31)
+        solver.parameters.num_workers = 1
+        # wall-clock limits depend on machine load; deterministic time does not.
+        # The wall-clock limit stays as a generous outer bound.
+        solver.parameters.max_deterministic_time = time_limit
+        solver.parameters.max_time_in_seconds = 4 * time_limit
     status = solver.Solve(model)
 
     result = {}
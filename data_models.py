@@ -1,11 +1,15 @@
 # data_models.py
 from sqlalchemy import (
-    Column, Integer, String, Float, Boolean, ForeignKey, UniqueConstraint, Table
+    Column, Integer, String, Float, Boolean, ForeignKey, UniqueConstraint, Table, Index
 )
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
 
+# Term label, same format as the `semester` column of the RF history CSV.
+# Rows created before terms existed belong to this term.
+DEFAULT_TERM = "Spring2025"
+
 # many-to-many: course prerequisites (Course -> Course)
 course_prereq = Table(
     "course_prereq",
@@ -24,6 +28,7 @@ class Student(Base):
     evaluation_done = Column(Boolean, default=False)
     level = Column(Integer, default=1)
     department = Column(String(20))
+    seat_version = Column(Integer, default=1, nullable=False)   # bumped by every seat claim/release (CAS)
 
     preferences = relationship("Preference", back_populates="student")
     assignments = relationship("Assignment", back_populates="student")
@@ -56,6 +61,7 @@ class Course(Base):
 class Section(Base):
     __tablename__ = "sections"
     id = Column(Integer, primary_key=True)
+    term = Column(String(16), default=DEFAULT_TERM, nullable=False)
     course_id = Column(String(32), ForeignKey("courses.id"))
     code = Column(String(8))          # A,B,C...
     day = Column(String(12))          # Monday, Tuesday...
@@ -64,30 +70,73 @@ class Section(Base):
     room = Column(String(40))
     capacity = Column(Integer, default=40)
     faculty_id = Column(Integer, ForeignKey("faculty.id"), nullable=True)  # can be NULL / N/A
+    enrolled = Column(Integer, default=0, nullable=False)   # seats taken (current assignments)
+    version = Column(Integer, default=1, nullable=False)    # optimistic-lock counter
 
     course = relationship("Course", back_populates="sections")
     faculty = relationship("Faculty", back_populates="sections")
     assignments = relationship("Assignment", back_populates="section")
 
-    __table_args__ = (UniqueConstraint('course_id', 'code', name='uq_course_section'),)
+    __table_args__ = (
+        UniqueConstraint('term', 'course_id', 'code', name='uq_term_course_section'),
+        Index('ix_sections_term_course', 'term', 'course_id'),
+    )
+    # every ORM UPDATE of a section checks and bumps `version` (compare-and-swap)
+    __mapper_args__ = {"version_id_col": version}
 
 class Preference(Base):
     __tablename__ = "preferences"
     id = Column(Integer, primary_key=True)
-    student_id = Column(Integer, ForeignKey("students.id"))
+    term = Column(String(16), default=DEFAULT_TERM, nullable=False)
+    student_id = Column(Integer, ForeignKey("students.id"), index=True)
     course_id = Column(String(32), ForeignKey("courses.id"))
-    preferred_sections = Column(String(50))  # e.g., "A,B,C"
+    preferred_sections = Column(String(50))  # e.g., "A,B,C" — kept for backward compatibility
     time_pref = Column(String(20))           # e.g., morning/avoid_08
 
     student = relationship("Student", back_populates="preferences")
     course = relationship("Course")
+    choices = relationship("PreferenceChoice", back_populates="preference",
+                           order_by="PreferenceChoice.rank", cascade="all, delete-orphan")
+
+    __table_args__ = (Index('ix_preferences_term_student', 'term', 'student_id'),)
+
+class PreferenceChoice(Base):
+    """One ranked section choice of a Preference (normalized form of preferred_sections)."""
+    __tablename__ = "preference_choices"
+    id = Column(Integer, primary_key=True)
+    preference_id = Column(Integer, ForeignKey("preferences.id"), index=True, nullable=False)
+    section_id = Column(Integer, ForeignKey("sections.id"), nullable=False)
+    rank = Column(Integer, nullable=False)   # 1 = first choice
+
+    preference = relationship("Preference", back_populates="choices")
+    section = relationship("Section")
+
+    __table_args__ = (UniqueConstraint('preference_id', 'section_id', name='uq_preference_section'),)
 
 class Assignment(Base):
     __tablename__ = "assignments"
     id = Column(Integer, primary_key=True)
+    term = Column(String(16), default=DEFAULT_TERM, nullable=False)
     student_id = Column(Integer, ForeignKey("students.id"))
     section_id = Column(Integer, ForeignKey("sections.id"))
     status = Column(String(20), default="assigned")  # assigned / not_assigned
+    run_id = Column(Integer, ForeignKey("schedule_runs.id"), nullable=True, index=True)  # NULL = reopt / reservation
 
     student = relationship("Student", back_populates="assignments")
     section = relationship("Section", back_populates="assignments")
+    run = relationship("ScheduleRun", back_populates="assignments")
+
+    # "latest assignment per student" is always asked within one term
+    __table_args__ = (Index('ix_assignments_term_student', 'term', 'student_id'),)
+
+class ScheduleRun(Base):
+    """One persisted generate_schedule run, keyed by a fingerprint of its inputs."""
+    __tablename__ = "schedule_runs"
+    id = Column(Integer, primary_key=True)
+    term = Column(String(16), default=DEFAULT_TERM, nullable=False, index=True)
+    fingerprint = Column(String(64), index=True, nullable=False)
+    engine = Column(String(20))
+    seed = Column(Integer)            # seed actually used
+    created_at = Column(Float)        # unix time
+
+    assignments = relationship("Assignment", back_populates="run")
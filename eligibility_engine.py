@@ -13,6 +13,11 @@ def priority_weight(stu: Student) -> float:
     # High priority: CGPA >= 3.5 → +1.0 otherwise 0
     return 1.0 if stu.cgpa >= 3.5 else 0.0
 
+def priority_tier(stu: Student) -> int:
+    # CGPA bands for the fairness objective: 0 (<2.5), 1 (2.5–3.0), 2 (3.0–3.5), 3 (>=3.5)
+    cgpa = stu.cgpa or 0.0
+    return 3 if cgpa >= 3.5 else 2 if cgpa >= 3.0 else 1 if cgpa >= 2.5 else 0
+
 def make_eligibility_snapshot(sess: Session) -> Dict[str, dict]:
     """Output: {student_id: {eligible:bool, priority:float}}"""
     result = {}
@@ -20,6 +25,7 @@ def make_eligibility_snapshot(sess: Session) -> Dict[str, dict]:
         result[s.student_id] = {
             "eligible": is_eligible(s),
             "priority": priority_weight(s),
+            "tier": priority_tier(s),
             "level": s.level,
             "dept": s.department
         }
@@ -0,0 +1,188 @@
+# export_schedule.py
+"""
+Streaming schedule / roster export for downstream systems (LMS, room booking,
+billing).
+
+Rows are assignments joined with student, section, course and faculty data,
+read through a server-side cursor in batches (yield_per + stream_results), so
+memory stays flat however large the campus is. CSV is emitted one batch at a
+time; Parquet is written one row group per batch (needs the optional pyarrow
+package).
+
+By default the export is the current schedule (each student's latest
+assignment in each term); pass term to limit it to one term, or run_id to
+export exactly what one generate_schedule run stored. order="section" groups
+rows by section (class rosters).
+
+How to run:
+    python export_schedule.py --out schedule.csv
+    python export_schedule.py --out rosters.parquet --order section --term Spring2025
+"""
+
+import argparse
+import csv
+import io
+from typing import Iterator, Optional
+
+from sqlalchemy import func, select
+
+from data_models import Assignment, Course, Faculty, Section, Student
+
+EXPORT_COLUMNS = [
+    "term", "student_id", "student_name", "department", "status",
+    "section_id", "course_id", "course_title", "credits", "section_code",
+    "day", "start_time", "end_time", "room", "faculty_code", "faculty_name",
+]
+EXPORT_ORDERS = ("student", "section")
+BATCH_SIZE = 1000
+
+
+def export_query(run_id: Optional[int] = None, order: str = "student", term: Optional[str] = None):
+    """SELECT of EXPORT_COLUMNS for the current schedule (optionally one term) or one stored run."""
+    if order not in EXPORT_ORDERS:
+        raise ValueError(f"Unknown order '{order}' (expected one of {EXPORT_ORDERS})")
+    if run_id is None:
+        picked = select(func.max(Assignment.id))
+        if term:
+            picked = picked.where(Assignment.term == term)
+        picked = picked.group_by(Assignment.term, Assignment.student_id)
+    else:
+        picked = select(Assignment.id).where(Assignment.run_id == run_id)
+
+    stmt = (
+        select(Assignment.term, Student.student_id, Student.name, Student.department, Assignment.status,
+               Section.id, Course.id, Course.title, Course.credits, Section.code,
+               Section.day, Section.start_time, Section.end_time, Section.room,
+               Faculty.code, Faculty.name)
+        .join(Student, Student.id == Assignment.student_id)
+        .outerjoin(Section, Section.id == Assignment.section_id)
+        .outerjoin(Course, Course.id == Section.course_id)
+        .outerjoin(Faculty, Faculty.id == Section.faculty_id)
+        .where(Assignment.id.in_(picked))
+    )
+    if order == "section":
+        return stmt.order_by(Assignment.term, Section.id, Student.student_id)
+    return stmt.order_by(Assignment.term, Student.student_id)
+
+
+def iter_batches(sess, run_id: Optional[int] = None, order: str = "student",
+                 batch_size: int = BATCH_SIZE, term: Optional[str] = None) -> Iterator[list]:
+    """Yield lists of row tuples, batch_size at a time, from a server-side cursor."""
+    stmt = export_query(run_id, order, term).execution_options(yield_per=batch_size, stream_results=True)
+    result = sess.execute(stmt)
+    try:
+        for part in result.partitions():
+            yield [tuple(r) for r in part]
+    finally:
+        result.close()
+
+
+def stream_csv(sess, run_id: Optional[int] = None, order: str = "student",
+               batch_size: int = BATCH_SIZE, term: Optional[str] = None) -> Iterator[str]:
+    """CSV text, header first, then one chunk per batch."""
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buf.getvalue()
+    for rows in iter_batches(sess, run_id, order, batch_size, term):
+        buf.seek(0)
+        buf.truncate()
+        writer.writerows(rows)
+        yield buf.getvalue()
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise RuntimeError("Parquet export needs the optional 'pyarrow' package (pip install pyarrow); "
+                           "use CSV instead.") from e
+    return pa, pq
+
+
+def _arrow_schema(pa):
+    types = {"section_id": pa.int64(), "credits": pa.int64()}
+    return pa.schema([(c, types.get(c, pa.string())) for c in EXPORT_COLUMNS])
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a generator."""
+
+    def __init__(self):
+        self.chunks = []
+        self.pos = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        out, self.chunks = b"".join(self.chunks), []
+        return out
+
+
+def stream_parquet(sess, run_id: Optional[int] = None, order: str = "student",
+                   batch_size: int = BATCH_SIZE, term: Optional[str] = None) -> Iterator[bytes]:
+    """Parquet bytes, one row group per batch; the footer comes with the last chunk."""
+    pa, pq = _require_pyarrow()
+    schema = _arrow_schema(pa)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in iter_batches(sess, run_id, order, batch_size, term):
+            writer.write_table(pa.Table.from_pylist([dict(zip(EXPORT_COLUMNS, r)) for r in rows], schema=schema))
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export_to_file(sess, path: str, fmt: Optional[str] = None, run_id: Optional[int] = None,
+                   order: str = "student", batch_size: int = BATCH_SIZE, term: Optional[str] = None) -> str:
+    """Stream the export into a file; fmt defaults from the extension (.parquet → parquet, else csv)."""
+    fmt = fmt or ("parquet" if path.endswith(".parquet") else "csv")
+    if fmt == "parquet":
+        with open(path, "wb") as f:
+            for chunk in stream_parquet(sess, run_id, order, batch_size, term):
+                f.write(chunk)
+    elif fmt == "csv":
+        with open(path, "w", newline="", encoding="utf-8") as f:
+            for chunk in stream_csv(sess, run_id, order, batch_size, term):
+                f.write(chunk)
+    else:
+        raise ValueError(f"Unknown export format '{fmt}' (expected 'csv' or 'parquet')")
+    return path
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, init_db
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--out", required=True, help="output file (.csv or .parquet)")
+    ap.add_argument("--format", choices=["csv", "parquet"], default=None)
+    ap.add_argument("--run-id", type=int, default=None, help="export one stored run instead of the current schedule")
+    ap.add_argument("--order", choices=EXPORT_ORDERS, default="student",
+                    help="'section' groups rows into class rosters")
+    ap.add_argument("--term", default=None, help="limit the current schedule to one term")
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    args = ap.parse_args()
+
+    init_db()
+    sess = SessionLocal()
+    try:
+        export_to_file(sess, args.out, args.format, args.run_id, args.order, args.batch_size, args.term)
+    finally:
+        sess.close()
+    print(f"✅ Exported schedule to {args.out}")
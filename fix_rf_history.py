@@ -7,16 +7,16 @@ print("Before:", df.columns.tolist())
 
 # Rename to match train_from_csv.py expectations
 rename_map = {
-    "Program": "semester",      # assuming "Program" used as semester label
+    "Program": "program",
     "CourseCode": "course_id",
     "Enrollment": "enrollment",
-    "Semester": "semester"      # keep whichever exists
+    "Semester": "semester"
 }
 
 df.rename(columns=rename_map, inplace=True)
 
-# Keep only the required columns
-df = df[["semester", "course_id", "enrollment"]]
+# Keep the required columns (+ program, used as a forecasting feature)
+df = df[[c for c in ["semester", "program", "course_id", "enrollment"] if c in df.columns]]
 
 df.to_csv("rf_history_from_combined.csv", index=False)
 
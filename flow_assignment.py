@@ -0,0 +1,169 @@
+# flow_assignment.py
+"""
+Exact student → section assignment as a min-cost flow.
+
+When every student requests a single course and the only hard limits are
+section capacity and faculty availability, assignment is a bipartite
+matching problem that OR-Tools' SimpleMinCostFlow solves exactly in
+polynomial time:
+
+    source ──1──▶ student ──1──▶ candidate section ──capacity──▶ sink
+                     └──────────1 (unassigned, cost 0)──────────▶ sink
+
+Arc costs maximize the number of assigned students first and then the GA's
+weighted per-assignment score (preference, priority, demand; see scoring.py).
+Faculty max_load and room clashes couple sections together and are not
+expressible as flow arcs; is_capacity_only() tells the caller when they can
+bind. runnable_sections() then settles them with a small CP over which
+sections run (one boolean per section, not per student × section), and a
+second flow over the runnable sections gives a feasible assignment.
+"""
+
+from collections import defaultdict
+from typing import Dict
+
+import numpy as np
+from ortools.graph.python import min_cost_flow
+from ortools.sat.python import cp_model
+
+from scoring import ScoringEngine
+from timetable_index import build_slot_index, find_clashes, room_key
+
+SCORE_SCALE = 100   # flow costs are integers: scores kept to 2 decimals
+
+
+def allowed_sections(sections, faculty=None):
+    """Sections that may take students: faculty assigned and available."""
+    unavailable = {f.id for f in (faculty or []) if not f.available}
+    return [sec for sec in sections if sec.faculty_id is not None and sec.faculty_id not in unavailable]
+
+
+def is_capacity_only(sections, faculty=None) -> bool:
+    """True when no faculty load limit can bind and no two sections clash in a room."""
+    per_faculty = defaultdict(int)
+    for sec in sections:
+        per_faculty[sec.faculty_id] += 1
+    for f in faculty or []:
+        if f.max_load is not None and per_faculty.get(f.id, 0) > f.max_load:
+            return False
+    return not find_clashes(build_slot_index(sections, room_key))
+
+
+def candidate_pairs(students, open_secs, preferences):
+    """
+    (student_idx, section_idx) arrays of allowed pairs: the open sections of
+    the student's preferred course. A student without a preference may take any
+    open section; one whose course has no open section gets no candidates and
+    stays unassigned.
+    """
+    by_course = defaultdict(list)
+    for j, sec in enumerate(open_secs):
+        by_course[sec.course_id].append(j)
+    all_secs = np.arange(len(open_secs), dtype=np.int64)
+    stu_parts, sec_parts = [np.zeros(0, dtype=np.int64)], [np.zeros(0, dtype=np.int64)]
+    for i, s in enumerate(students):
+        pref = preferences.get(s.student_id)
+        cands = np.array(by_course.get(pref.course_id, []), dtype=np.int64) if pref else all_secs
+        stu_parts.append(np.full(len(cands), i, dtype=np.int64))
+        sec_parts.append(cands)
+    return np.concatenate(stu_parts), np.concatenate(sec_parts)
+
+
+def scaled_pair_scores(engine: ScoringEngine, pair_stu, pair_sec):
+    """
+    Integer scores for candidate pairs plus the per-assignment reward that
+    makes one more assigned student outweigh any reshuffle of scores.
+    """
+    scores = np.rint(engine.pair_scores(pair_stu, pair_sec) * SCORE_SCALE).astype(np.int64)
+    if scores.size == 0:
+        return scores, 1
+    spread = int(scores.max() - min(int(scores.min()), 0)) + 1
+    return scores, spread * engine.n_students + 1
+
+
+def runnable_sections(sections, faculty, assignment: Dict[str, int], time_limit: float = 5.0):
+    """
+    Pick the sections that may run so faculty max_load and room clashes hold,
+    keeping as many of the assignment's students seated as possible (then as
+    many sections open as possible). Returns the runnable subset of sections.
+    """
+    secs = allowed_sections(sections, faculty)
+    load = defaultdict(int)
+    for sec_id in assignment.values():
+        if sec_id is not None:
+            load[sec_id] += 1
+
+    model = cp_model.CpModel()
+    is_open = {sec.id: model.NewBoolVar(f"open_{sec.id}") for sec in secs}
+    fac_by_id = {f.id: f for f in (faculty or [])}
+    by_faculty = defaultdict(list)
+    for sec in secs:
+        by_faculty[sec.faculty_id].append(is_open[sec.id])
+    for fid, opens in by_faculty.items():
+        max_load = getattr(fac_by_id.get(fid), "max_load", None)
+        if max_load is not None and len(opens) > max_load:
+            model.Add(sum(opens) <= max_load)
+    for a, b, _room, _day in find_clashes(build_slot_index(secs, room_key)):
+        model.AddBoolOr([is_open[a].Not(), is_open[b].Not()])
+    big = len(secs) + 1
+    model.Maximize(sum((big * load[sid] + 1) * v for sid, v in is_open.items()))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = 1
+    solver.parameters.random_seed = 0
+    status = solver.Solve(model)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return []
+    return [sec for sec in secs if solver.Value(is_open[sec.id])]
+
+
+def flow_assign(students, sections, preferences: Dict[str, object], priomap: Dict[str, float],
+                demand_weight: Dict[str, float], faculty=None, weights: Dict[str, float] = None):
+    """
+    students / sections: ORM rows or snapshot records
+    preferences: {student_id: Preference}; a preference's course_id limits the
+                 student's candidates to that course's sections
+    Returns: dict {student_id: section_id or None}
+    """
+    if not students:
+        return {}
+    open_secs = allowed_sections(sections, faculty)
+    if not open_secs:
+        return {s.student_id: None for s in students}
+
+    engine = ScoringEngine(students, open_secs, preferences, priomap, demand_weight, weights=weights)
+    n_stu, n_sec = len(students), len(open_secs)
+
+    pair_stu, pair_sec = candidate_pairs(students, open_secs, preferences)
+    scores, reward = scaled_pair_scores(engine, pair_stu, pair_sec)
+
+    # ---- graph: 0 = source, 1..n_stu = students, then sections, then sink ----
+    source, sink = 0, n_stu + n_sec + 1
+    stu_node = 1 + np.arange(n_stu)
+    sec_node = 1 + n_stu + np.arange(n_sec)
+    capacity = np.maximum(engine.capacity.astype(np.int64), 0)
+
+    tails = np.concatenate([np.full(n_stu, source), stu_node[pair_stu], stu_node, sec_node])
+    heads = np.concatenate([stu_node, sec_node[pair_sec], np.full(n_stu, sink), np.full(n_sec, sink)])
+    caps = np.concatenate([np.ones(n_stu), np.ones(len(pair_stu)), np.ones(n_stu), capacity])
+    costs = np.concatenate([np.zeros(n_stu), -(reward + scores), np.zeros(n_stu), np.zeros(n_sec)])
+
+    mcf = min_cost_flow.SimpleMinCostFlow()
+    mcf.add_arcs_with_capacity_and_unit_cost(tails.astype(np.int32), heads.astype(np.int32),
+                                             caps.astype(np.int64), costs.astype(np.int64))
+    supplies = np.zeros(sink + 1, dtype=np.int64)
+    supplies[source], supplies[sink] = n_stu, -n_stu
+    mcf.set_nodes_supplies(np.arange(sink + 1, dtype=np.int32), supplies)
+
+    status = mcf.solve()
+    if status != mcf.OPTIMAL:
+        print(f"⚠️ Min-cost flow failed (status {status}) — nobody assigned.")
+        return {s.student_id: None for s in students}
+
+    pair_arcs = n_stu + np.arange(len(pair_stu))
+    used = mcf.flows(pair_arcs.astype(np.int32)) > 0
+    result = {s.student_id: None for s in students}
+    for i, j in zip(pair_stu[used], pair_sec[used]):
+        result[students[i].student_id] = open_secs[j].id
+    return result
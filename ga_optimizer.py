@@ -1,12 +1,15 @@
 # ga_optimizer.py
-import random
 from typing import Dict, List
+import numpy as np
 from data_models import Student, Section, Preference
+from scoring import ScoringEngine, OBJECTIVES, SELECTION_MODES
 
 
 class GAOptimizer:
     def __init__(self, sections: List[Section], preferences: Dict[str, Preference],
-                 priomap: Dict[str, float], demand_weight: Dict[str, float]):
+                 priomap: Dict[str, float], demand_weight: Dict[str, float], seed: int | None = None,
+                 weights: Dict[str, float] | None = None, selection: str = "weighted",
+                 lex_order: List[str] | None = None):
         """
         Genetic Algorithm (GA) Optimizer for AI Class Scheduling.
         ----------------------------------------------------------
@@ -14,92 +17,77 @@ class GAOptimizer:
         preferences: {student_id: Preference}
         priomap: {student_id: priority weight (based on CGPA, payment, etc.)}
         demand_weight: {course_id: predicted demand (from Random Forest)}
+        seed: RNG seed; same seed + same inputs → same schedule
+        weights: {objective: weight} for scoring.OBJECTIVES (default = original fitness)
+        selection: 'weighted', 'lexicographic' or 'pareto' ranking of each generation
+        lex_order: objective priority for lexicographic selection (default: by weight)
         """
+        if selection not in SELECTION_MODES:
+            raise ValueError(f"Unknown selection '{selection}' (expected one of {SELECTION_MODES})")
         self.sections = sections or []
         self.preferences = preferences or {}
         self.priomap = priomap or {}
         self.demand_weight = demand_weight or {}
         self.section_ids = [s.id for s in self.sections] if self.sections else []
+        self.weights = weights
+        self.selection = selection
+        self.lex_order = lex_order
+        self.rng = np.random.default_rng(seed)
+        self.last_objectives = None   # objective vector of the returned schedule
+        self._engine = (None, None)   # (student ids, ScoringEngine) of the last student set
+
+    def scoring_engine(self, students: List[Student]) -> ScoringEngine:
+        """Encoded scoring tables for a student set; built once and reused while the set is unchanged."""
+        key = tuple(s.student_id for s in students)
+        if self._engine[0] != key:
+            self._engine = (key, ScoringEngine(students, self.sections, self.preferences, self.priomap,
+                                               self.demand_weight, weights=self.weights))
+        return self._engine[1]
 
     # ------------------------------------------------------
-    # 1️⃣ Generate Random Individual (Chromosome)
+    # 1️⃣ Generate Random Population (Chromosomes)
     # ------------------------------------------------------
-    def random_individual(self, students: List[Student]) -> Dict[str, int | None]:
-        """Randomly assign each student to a section (or None)."""
-        indiv = {}
-        if not self.section_ids:
-            return {s.student_id: None for s in students}  # no available sections
-
-        for s in students:
-            # lower-priority students have a small chance to be unassigned
-            if self.priomap.get(s.student_id, 0) < 0 and random.random() < 0.3:
-                indiv[s.student_id] = None
-            else:
-                indiv[s.student_id] = random.choice(self.section_ids)
-        return indiv
+    def random_population(self, students: List[Student], pop_size: int) -> np.ndarray:
+        """(pop_size, n_students) random section indices; -1 = unassigned."""
+        n_stu, n_sec = len(students), len(self.section_ids)
+        pop = self.rng.integers(0, n_sec, size=(pop_size, n_stu))
+        # lower-priority students have a small chance to be unassigned
+        low = np.array([self.priomap.get(s.student_id, 0) < 0 for s in students], dtype=bool)
+        drop = low[None, :] & (self.rng.random((pop_size, n_stu)) < 0.3)
+        pop[drop] = -1
+        return pop
 
     # ------------------------------------------------------
     # 2️⃣ Fitness Function
     # ------------------------------------------------------
     def fitness(self, indiv: Dict[str, int], students: List[Student]) -> float:
-        """Evaluate how good a schedule is based on preferences & priorities."""
+        """Weighted score of a single {student_id: section_id} schedule."""
         if not indiv:
             return 0.0
-
-        score = 0.0
-        sec_by_id = {s.id: s for s in self.sections}
-
-        for s in students:
-            sec_id = indiv.get(s.student_id)
-            if not sec_id or sec_id not in sec_by_id:
-                continue
-            sec = sec_by_id[sec_id]
-            pref = self.preferences.get(s.student_id)
-
-            # ---- Preference Matching Bonus ----
-            if pref:
-                preferred = set([x.strip() for x in (pref.preferred_sections or "").split(",") if x.strip()])
-                if sec.code in preferred:
-                    score += 2.0
-                # Time penalty (avoid morning)
-                if pref.time_pref == "avoid_08" and str(sec.start_time).startswith("08"):
-                    score -= 1.0
-
-            # ---- Student Priority Weight ----
-            score += 3.0 * self.priomap.get(s.student_id, 0.0)
-
-            # ---- Demand Weight Bonus ----
-            score += 0.1 * self.demand_weight.get(sec.course_id, 0.0)
-
-        return score
+        engine = self.scoring_engine(students)
+        return float(engine.weighted(engine.evaluate(engine.encode(indiv)))[0])
 
     # ------------------------------------------------------
     # 3️⃣ Crossover Operator
     # ------------------------------------------------------
-    def crossover(self, p1: Dict[str, int], p2: Dict[str, int]) -> Dict[str, int]:
-        """Combine two parent schedules into a child."""
-        keys = list(p1.keys())
-        if len(keys) < 2:
-            return p1.copy()  # not enough genes to crossover safely
-
-        child = {}
-        cut = random.randint(1, len(keys) - 1)
-        for k in keys[:cut]:
-            child[k] = p1[k]
-        for k in keys[cut:]:
-            child[k] = p2[k]
-        return child
+    def crossover(self, parents1: np.ndarray, parents2: np.ndarray) -> np.ndarray:
+        """One-point crossover, row by row: genes before the cut from parent 1, the rest from parent 2."""
+        n_child, n_genes = parents1.shape
+        if n_genes < 2:
+            return parents1.copy()  # not enough genes to crossover safely
+        cuts = self.rng.integers(1, n_genes, size=n_child)
+        take_first = np.arange(n_genes)[None, :] < cuts[:, None]
+        return np.where(take_first, parents1, parents2)
 
     # ------------------------------------------------------
     # 4️⃣ Mutation Operator
     # ------------------------------------------------------
-    def mutate(self, indiv: Dict[str, int], rate=0.1):
-        """Randomly change a student's section assignment."""
+    def mutate(self, children: np.ndarray, rate=0.1):
+        """Randomly change students' section assignments in place."""
         if not self.section_ids:
             return
-        for k in list(indiv.keys()):
-            if random.random() < rate:
-                indiv[k] = random.choice(self.section_ids)
+        hit = self.rng.random(children.shape) < rate
+        children[hit] = self.rng.integers(0, len(self.section_ids), size=int(hit.sum()))
 
     # ------------------------------------------------------
     # 5️⃣ Run Genetic Algorithm
@@ -108,6 +96,7 @@ class GAOptimizer:
         """
         Run the Genetic Algorithm evolution process.
         - Creates initial population
+        - Scores every generation in one vectorized pass (all objectives at once)
         - Applies selection, crossover, and mutation
         - Returns the best schedule (mapping of student → section_id)
         """
@@ -115,27 +104,30 @@ class GAOptimizer:
             print("⚠️ GA skipped — no students or sections found.")
             return {}
 
-        # Initialize population
-        population = [self.random_individual(students) for _ in range(pop_size)]
+        engine = self.scoring_engine(students)
+        population = self.random_population(students, pop_size)
 
         for gen in range(generations):
-            population.sort(key=lambda ind: self.fitness(ind, students), reverse=True)
-            best_fit = self.fitness(population[0], students)
+            objectives = engine.evaluate(population)
+            order = engine.rank(objectives, self.selection, self.lex_order)
+            population = population[order]
+            best_fit = engine.weighted(objectives[order[:1]])[0]
             print(f"Generation {gen+1}/{generations} — Best fitness: {best_fit:.2f}")
 
-            next_gen = population[:2]  # elitism
-
-            while len(next_gen) < pop_size:
-                # pick two parents from top 10
-                if len(population) < 2:
-                    break
-                p1, p2 = random.sample(population[:min(10, len(population))], 2)
-                child = self.crossover(p1, p2)
-                self.mutate(child, 0.15)
-                next_gen.append(child)
-
-            population = next_gen
-
-        best = max(population, key=lambda ind: self.fitness(ind, students))
+            n_child = pop_size - 2  # elitism keeps the top 2
+            if n_child <= 0 or len(population) < 2:
+                continue
+            # pick two distinct parents from top 10
+            top = min(10, len(population))
+            p1 = self.rng.integers(0, top, size=n_child)
+            p2 = (p1 + self.rng.integers(1, top, size=n_child)) % top
+            children = self.crossover(population[p1], population[p2])
+            self.mutate(children, 0.15)
+            population = np.vstack([population[:2], children])
+
+        objectives = engine.evaluate(population)
+        best = engine.rank(objectives, self.selection, self.lex_order)[0]
+        self.last_objectives = {o: float(v) for o, v in zip(OBJECTIVES, objectives[best])}
         print("✅ GA completed successfully.")
-        return best
+        return engine.decode(population[best])
+
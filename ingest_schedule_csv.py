@@ -18,8 +18,8 @@ import numpy as np
 from pathlib import Path
 from typing import Dict, List
 
-from database import init_db, SessionLocal
-from data_models import Student, Course, Section, Preference, Assignment  # Faculty optional if you add model
+from database import init_db, SessionLocal, sync_preference_choices
+from data_models import DEFAULT_TERM, Student, Course, Section, Preference, Assignment  # Faculty optional if you add model
 # from prediction_engine import train_rf  # uncomment if you want to train from this file
 
 # --------- 1) Column mapping (fuzzy synonyms supported) ----------
@@ -100,7 +100,7 @@ def hhmm(s):
         return f"{digits[:2]}:{digits[2:]}"
     return s
 
-def seed_from_csv(csv_path: Path, train_rf: bool=False):
+def seed_from_csv(csv_path: Path, train_rf: bool=False, term: str=DEFAULT_TERM):
     init_db()
     sess = SessionLocal()
 
@@ -163,6 +163,7 @@ def seed_from_csv(csv_path: Path, train_rf: bool=False):
         sec_df = df.drop_duplicates(subset=subset_cols)
         for _, r in sec_df.iterrows():
             sec = Section(
+                term=term,
                 course_id=str(r[cid]),
                 code=str(r[s_code]),
                 day=str(r[s_day]),
@@ -202,17 +203,23 @@ def seed_from_csv(csv_path: Path, train_rf: bool=False):
     if stu_id and cid and (stu_pref or stu_tpref):
         # build map ext student_id -> internal pk
         smap = {s.student_id: s.id for s in sess.query(Student).all()}
+        new_prefs = []
         for _, r in df.drop_duplicates(subset=[stu_id, cid]).iterrows():
             sid = smap.get(str(r[stu_id]))
             if not sid: 
                 continue
             pref = Preference(
+                term=term,
                 student_id=sid,
                 course_id=str(r[cid]),
                 preferred_sections=str(r[stu_pref]) if stu_pref and not pd.isna(r.get(stu_pref, np.nan)) else "",
                 time_pref=str(r[stu_tpref]) if stu_tpref and not pd.isna(r.get(stu_tpref, np.nan)) else ""
             )
             sess.add(pref)
+            new_prefs.append(pref)
+        sess.flush()
+        # ranked, normalized copy of preferred_sections used by the optimizers
+        sync_preference_choices(sess, new_prefs)
         sess.commit()
         print("✔ Preferences seeded.")
 
@@ -239,10 +246,11 @@ if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--csv", default="class_schedule_combined.csv")
     ap.add_argument("--train-rf", action="store_true", help="also create rf_history_from_combined.csv")
+    ap.add_argument("--term", default=DEFAULT_TERM, help="term the sections/preferences belong to, e.g. Fall2025")
     args = ap.parse_args()
 
     csv_path = Path(args.csv)
     if not csv_path.exists():
         raise SystemExit(f"CSV not found: {csv_path}")
 
-    seed_from_csv(csv_path, train_rf=args.train_rf)
+    seed_from_csv(csv_path, train_rf=args.train_rf, term=args.term)
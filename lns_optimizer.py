@@ -0,0 +1,255 @@
+# lns_optimizer.py
+"""
+Large-neighborhood search (LNS) for student → section assignment.
+
+Starts from a greedy schedule (or a previous one), then repeatedly frees a
+neighborhood — one course, one time block or one department — and re-solves
+just that part exactly with a small CP-SAT model while everything else stays
+fixed. The search is anytime: it stops at a wall-clock deadline and always
+returns the best schedule found so far.
+
+Hard rules match cp_refine_schedule: section capacity, faculty availability,
+faculty max_load (open sections per faculty) and no two open sections
+clashing in a room. The objective matches flow_assignment: assigned students
+first, then the weighted per-assignment score.
+"""
+
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Dict, List
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from flow_assignment import allowed_sections, candidate_pairs, scaled_pair_scores
+from scoring import ScoringEngine
+from timetable_index import build_slot_index, find_clashes, room_key, section_slots
+
+NEIGHBORHOODS = ("course", "time_block", "department")
+MAX_IDLE_PICKS = 50   # consecutive empty neighborhoods before the search gives up
+
+
+class LNSOptimizer:
+    def __init__(self, sections, preferences: Dict[str, object], priomap: Dict[str, float],
+                 demand_weight: Dict[str, float], faculty=None, weights: Dict[str, float] = None,
+                 seed: int | None = None, time_limit: float = 10.0, sub_time_limit: float = 1.0,
+                 max_pairs: int = 5000):
+        """
+        sections / preferences / priomap / demand_weight: as for GAOptimizer
+        faculty: Faculty rows or records (id, max_load, available)
+        time_limit: wall-clock budget for the whole search (seconds)
+        sub_time_limit: cap for each neighborhood CP-SAT solve (seconds)
+        max_pairs: max (student, section) variables per neighborhood
+        """
+        self.preferences = preferences or {}
+        self.priomap = priomap or {}
+        self.demand_weight = demand_weight or {}
+        self.weights = weights
+        self.time_limit = time_limit
+        self.sub_time_limit = sub_time_limit
+        self.max_pairs = max_pairs
+        self.rng = random.Random(seed)
+
+        self.sections = allowed_sections(sections or [], faculty)
+        self.capacity = [max(int(sec.capacity or 0), 0) for sec in self.sections]
+        fac = {f.id: f for f in (faculty or [])}
+        self.max_load = {fid: f.max_load for fid, f in fac.items() if f.max_load is not None}
+        self.sec_faculty = [sec.faculty_id for sec in self.sections]
+
+        idx = {sec.id: j for j, sec in enumerate(self.sections)}
+        self.clash_adj = defaultdict(set)
+        for a, b, _room, _day in find_clashes(build_slot_index(self.sections, room_key)):
+            self.clash_adj[idx[a]].add(idx[b])
+            self.clash_adj[idx[b]].add(idx[a])
+
+        self.by_course = defaultdict(list)
+        self.by_block = defaultdict(list)
+        for j, sec in enumerate(self.sections):
+            self.by_course[sec.course_id].append(j)
+            for day, start, _end in section_slots(sec):
+                self.by_block[(day, start)].append(j)
+
+    # ------------------------------------------------------
+    # State helpers
+    # ------------------------------------------------------
+    def _can_take(self, j: int) -> bool:
+        """Room left in section j, and opening it (if closed) breaks no faculty/room rule."""
+        if self.load[j] >= self.capacity[j]:
+            return False
+        if self.load[j] > 0:
+            return True
+        fid = self.sec_faculty[j]
+        if fid in self.max_load and self.fac_open[fid] >= self.max_load[fid]:
+            return False
+        return not any(self.load[k] > 0 for k in self.clash_adj.get(j, ()))
+
+    def _move(self, i: int, j: int):
+        old = self.genes[i]
+        if old >= 0:
+            self.load[old] -= 1
+            if self.load[old] == 0:
+                self.fac_open[self.sec_faculty[old]] -= 1
+        if j >= 0:
+            if self.load[j] == 0:
+                self.fac_open[self.sec_faculty[j]] += 1
+            self.load[j] += 1
+        self.genes[i] = j
+
+    def _initial(self, initial: Dict[str, int] | None):
+        """Keep feasible parts of a previous schedule, then fill greedily (best value first)."""
+        idx = {sec.id: j for j, sec in enumerate(self.sections)}
+        if initial:
+            for i, sid in enumerate(self.student_ids):
+                j = idx.get(initial.get(sid), -1)
+                if j >= 0 and j in self.cand_value[i] and self._can_take(j):
+                    self._move(i, j)
+        order = sorted(range(len(self.student_ids)),
+                       key=lambda i: -max(self.cand_value[i].values(), default=0))
+        for i in order:
+            if self.genes[i] >= 0:
+                continue
+            for j, _v in sorted(self.cand_value[i].items(), key=lambda kv: -kv[1]):
+                if self._can_take(j):
+                    self._move(i, j)
+                    break
+
+    def _value(self) -> int:
+        return sum(self.cand_value[i][g] for i, g in enumerate(self.genes) if g >= 0)
+
+    # ------------------------------------------------------
+    # Neighborhoods
+    # ------------------------------------------------------
+    def _neighborhood(self, kind: str):
+        """Pick (free_students, free_sections) for one LNS step."""
+        if kind == "department":
+            dept = self.rng.choice(self.departments)
+            pool = list(self.by_dept[dept])
+            secs = None
+        else:
+            groups = self.by_course if kind == "course" else self.by_block
+            secs = set(groups[self.rng.choice(list(groups))])
+            pool = [i for i, g in enumerate(self.genes)
+                    if g in secs or (g < 0 and secs.intersection(self.cand_value[i]))]
+        self.rng.shuffle(pool)
+
+        free, free_secs, pairs = [], set(), 0
+        for i in pool:
+            cands = self.cand_value[i].keys() if secs is None else secs.intersection(self.cand_value[i])
+            if pairs + len(cands) > self.max_pairs and free:
+                break
+            free.append(i)
+            free_secs.update(cands)
+            pairs += len(cands)
+        return free, free_secs
+
+    def _resolve(self, free: List[int], free_secs: set, deadline: float) -> bool:
+        """Exactly re-solve the freed part with CP-SAT; apply it if it is no worse. True if improved."""
+        model = cp_model.CpModel()
+        freed_from = Counter(int(self.genes[i]) for i in free)
+        fixed_load = {j: self.load[j] - freed_from[j] for j in free_secs}
+
+        x = {}
+        for i in free:
+            row = []
+            for j in self.cand_value[i]:
+                if j in free_secs:
+                    x[i, j] = model.NewBoolVar(f"x_{i}_{j}")
+                    row.append(x[i, j])
+            if row:
+                model.Add(sum(row) <= 1)
+
+        is_open = {j: model.NewBoolVar(f"open_{j}") for j in free_secs}
+        by_sec = defaultdict(list)
+        for (i, j), var in x.items():
+            by_sec[j].append(var)
+        for j in free_secs:
+            model.Add(fixed_load[j] + sum(by_sec[j]) <= self.capacity[j] * is_open[j])
+            if fixed_load[j] > 0:
+                model.Add(is_open[j] == 1)
+            for k in self.clash_adj.get(j, ()):
+                if k in free_secs:
+                    if j < k:
+                        model.AddBoolOr([is_open[j].Not(), is_open[k].Not()])
+                elif self.load[k] > 0:
+                    model.Add(is_open[j] == 0)
+
+        fac_secs = defaultdict(list)
+        for j in free_secs:
+            fac_secs[self.sec_faculty[j]].append(j)
+        for fid, secs in fac_secs.items():
+            if fid in self.max_load:
+                open_outside = self.fac_open[fid] - sum(1 for j in secs if self.load[j] > 0)
+                model.Add(sum(is_open[j] for j in secs) <= self.max_load[fid] - open_outside)
+
+        model.Maximize(sum(self.cand_value[i][j] * var for (i, j), var in x.items()))
+        for (i, j), var in x.items():
+            model.AddHint(var, 1 if self.genes[i] == j else 0)
+
+        solver = cp_model.CpSolver()
+        solver.parameters.max_time_in_seconds = max(0.01, min(self.sub_time_limit, deadline - time.monotonic()))
+        solver.parameters.num_workers = 1
+        status = solver.Solve(model)
+        if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+            return False
+
+        before = sum(self.cand_value[i][self.genes[i]] for i in free if self.genes[i] >= 0)
+        after = int(round(solver.ObjectiveValue()))
+        if after < before:
+            return False
+        new = {i: next((j for j in self.cand_value[i] if (i, j) in x and solver.Value(x[i, j])), -1)
+               for i in free}
+        for i in free:
+            self._move(i, -1)
+        for i in free:
+            self._move(i, new[i])
+        return after > before
+
+    # ------------------------------------------------------
+    # Run LNS
+    # ------------------------------------------------------
+    def run(self, students, initial: Dict[str, int] | None = None):
+        """
+        students: list of Student / StudentRec
+        initial: optional previous {student_id: section_id} to start from
+        Returns the best schedule found before the deadline.
+        """
+        if not students or not self.sections:
+            print("⚠️ LNS skipped — no students or open sections found.")
+            return {s.student_id: None for s in students or []}
+        deadline = time.monotonic() + self.time_limit
+
+        engine = ScoringEngine(students, self.sections, self.preferences, self.priomap,
+                               self.demand_weight, weights=self.weights)
+        pair_stu, pair_sec = candidate_pairs(students, self.sections, self.preferences)
+        scores, reward = scaled_pair_scores(engine, pair_stu, pair_sec)
+        self.cand_value = [dict() for _ in students]
+        for i, j, sc in zip(pair_stu.tolist(), pair_sec.tolist(), scores.tolist()):
+            self.cand_value[i][j] = reward + sc
+
+        self.student_ids = [s.student_id for s in students]
+        self.by_dept = defaultdict(list)
+        for i, s in enumerate(students):
+            self.by_dept[getattr(s, "department", None) or "UNK"].append(i)
+        self.departments = list(self.by_dept)
+
+        self.genes = np.full(len(students), -1, dtype=np.int64)
+        self.load = [0] * len(self.sections)
+        self.fac_open = defaultdict(int)
+        self._initial(initial)
+        print(f"LNS start — assigned {int((self.genes >= 0).sum())}/{len(students)}, value {self._value()}")
+
+        steps = improved = idle = 0
+        while time.monotonic() < deadline and idle < MAX_IDLE_PICKS:
+            kind = self.rng.choice(NEIGHBORHOODS)
+            free, free_secs = self._neighborhood(kind)
+            if not free or not free_secs:
+                idle += 1   # nothing to re-solve here; stop once every pick comes up empty
+                continue
+            idle = 0
+            improved += self._resolve(free, free_secs, deadline)
+            steps += 1
+
+        print(f"✅ LNS finished — {steps} neighborhoods, {improved} improvements, "
+              f"assigned {int((self.genes >= 0).sum())}/{len(students)}, value {self._value()}")
+        return engine.decode(self.genes)
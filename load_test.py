@@ -0,0 +1,327 @@
+# load_test.py
+"""
+Load-testing harness for the Flask API.
+
+Simulated registrants (one thread each) fire a weighted mix of requests at
+the app — in-process through the Flask test client, or at a running server
+with --url — and the run reports latency percentiles per request kind,
+throughput, error rates and, in-process, how long SQL writes waited on the
+database lock.
+
+Request kinds (weights set with --mix):
+- read:     GET  /api/students/<id>/assignment   (a registrant checks their seat)
+- reserve:  POST /api/reserve, then /api/release  (direct seat claims)
+- reopt:    POST /api/reopt with a drop event     (unseats the student, re-seats the waiting list)
+- generate: POST /api/generate                   (full run; --force-refresh skips the run cache)
+- export:   GET  /api/export/schedule.csv        (streamed roster export)
+/admin/upload-csv is left out: re-seeding the same file is not idempotent.
+
+In-process runs work on a throwaway copy of the database (--db), so the
+real data is never touched. 4xx answers (seat full, already assigned) are
+counted as rejections, 5xx and exceptions as errors.
+
+How to run:
+    python load_test.py --users 20 --duration 30 --mix read=60,reserve=25,reopt=10,generate=5
+    python load_test.py --url http://localhost:5000 --users 50 --duration 60 --json report.json
+"""
+
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from typing import Dict, List
+
+REQUEST_KINDS = ("read", "reserve", "reopt", "generate", "export")
+DEFAULT_MIX = "read=60,reserve=25,reopt=10,generate=5"
+LOCK_WAIT_MS = 50   # a write statement slower than this is counted as a lock wait
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """'read=60,reserve=25' → {'read': 60.0, 'reserve': 25.0}"""
+    mix = {}
+    for part in filter(None, (p.strip() for p in text.split(","))):
+        kind, _, weight = part.partition("=")
+        if kind not in REQUEST_KINDS:
+            raise ValueError(f"Unknown request kind '{kind}' (expected one of {REQUEST_KINDS})")
+        mix[kind] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("Request mix is empty")
+    return mix
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(int(round(q / 100 * (len(sorted_values) - 1))), len(sorted_values) - 1)
+    return sorted_values[k]
+
+
+# ------------------------------------------------------
+# Transports
+# ------------------------------------------------------
+class TestClientTransport:
+    """In-process requests through Flask's test client (one client per thread)."""
+
+    def __init__(self):
+        from app import app
+        self.app = app
+        self._local = threading.local()
+
+    def request(self, method: str, path: str, body=None) -> int:
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        resp = client.open(path, method=method, json=body)
+        resp.get_data()   # drain streamed bodies so their full cost is measured
+        return resp.status_code
+
+
+class HttpTransport:
+    """Requests against a running server."""
+
+    def __init__(self, base_url: str, timeout: float = 300.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, body=None) -> int:
+        data = json.dumps(body).encode() if body is not None else None
+        req = urllib.request.Request(self.base_url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                resp.read()
+                return resp.status
+        except urllib.error.HTTPError as e:
+            return e.code
+
+
+# ------------------------------------------------------
+# DB lock-wait probe (in-process only)
+# ------------------------------------------------------
+class LockProbe:
+    """Times INSERT/UPDATE/DELETE statements; on SQLite the busy wait happens inside execute."""
+
+    def __init__(self, engine, threshold_ms: float = LOCK_WAIT_MS):
+        from sqlalchemy import event
+
+        self.threshold = threshold_ms / 1000
+        self.lock = threading.Lock()
+        self.write_times: List[float] = []
+        self.lock_errors = 0
+        event.listen(engine, "before_cursor_execute", self._before)
+        event.listen(engine, "after_cursor_execute", self._after)
+        event.listen(engine, "handle_error", self._error)
+
+    def _before(self, conn, cursor, statement, params, context, executemany):
+        conn.info.setdefault("t0", []).append(time.perf_counter())
+
+    def _after(self, conn, cursor, statement, params, context, executemany):
+        elapsed = time.perf_counter() - conn.info["t0"].pop()
+        if statement.lstrip()[:6].upper() in ("INSERT", "UPDATE", "DELETE"):
+            with self.lock:
+                self.write_times.append(elapsed)
+
+    def _error(self, ctx):
+        if ctx.connection is not None and ctx.connection.info.get("t0"):
+            ctx.connection.info["t0"].pop()
+        if "locked" in str(ctx.original_exception).lower():
+            with self.lock:
+                self.lock_errors += 1
+
+    def report(self) -> dict:
+        times = sorted(self.write_times)
+        waits = [t for t in times if t >= self.threshold]
+        return {
+            "write_statements": len(times),
+            "lock_waits": len(waits),
+            "lock_wait_total_s": round(sum(waits), 3),
+            "write_p95_ms": round(percentile(times, 95) * 1000, 2),
+            "write_max_ms": round((times[-1] if times else 0) * 1000, 2),
+            "lock_errors": self.lock_errors,
+        }
+
+
+# ------------------------------------------------------
+# Load generator
+# ------------------------------------------------------
+class LoadTest:
+    def __init__(self, transport, mix: Dict[str, float], student_ids: List[str], section_ids: List[int],
+                 course_ids: List[str], term: str = None, force_refresh: bool = False, seed: int = 0):
+        """
+        transport: TestClientTransport or HttpTransport
+        mix: {kind: weight}
+        student_ids / section_ids / course_ids: pools the simulated registrants draw from
+        """
+        self.transport = transport
+        self.kinds, self.weights = zip(*mix.items())
+        self.student_ids = student_ids
+        self.section_ids = section_ids
+        self.course_ids = course_ids
+        self.term = term
+        self.force_refresh = force_refresh
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)           # kind → [seconds]
+        self.outcomes = defaultdict(lambda: defaultdict(int))   # kind → {ok|rejected|error: n}
+
+    def _one(self, rng: random.Random, kind: str) -> List[tuple]:
+        """Run one request of a kind → [(kind, seconds, status)] (reserve also releases)."""
+        sid = rng.choice(self.student_ids)
+        term = {"term": self.term} if self.term else {}
+        if kind == "read":
+            calls = [("GET", f"/api/students/{sid}/assignment" + (f"?term={self.term}" if self.term else ""), None)]
+        elif kind == "reserve":
+            calls = [("POST", "/api/reserve", {"student_id": sid, "section_id": rng.choice(self.section_ids)}),
+                     ("POST", "/api/release", {"student_id": sid, **term})]
+        elif kind == "reopt":
+            calls = [("POST", "/api/reopt", {"events": [{"kind": "drop", "student_id": sid,
+                                                          "course_id": rng.choice(self.course_ids), **term}]})]
+        elif kind == "generate":
+            calls = [("POST", "/api/generate", {"force_refresh": self.force_refresh, **term})]
+        else:
+            calls = [("GET", "/api/export/schedule.csv" + (f"?term={self.term}" if self.term else ""), None)]
+
+        out = []
+        for method, path, body in calls:
+            t0 = time.perf_counter()
+            try:
+                status = self.transport.request(method, path, body)
+            except Exception:
+                status = None
+            out.append((kind, time.perf_counter() - t0, status))
+        return out
+
+    def _user(self, n: int, deadline: float, max_requests: int, think: float):
+        rng = random.Random(self.seed * 100003 + n)
+        done = 0
+        while time.monotonic() < deadline and (not max_requests or done < max_requests):
+            kind = rng.choices(self.kinds, self.weights)[0]
+            for k, seconds, status in self._one(rng, kind):
+                outcome = "error" if status is None or status >= 500 else "rejected" if status >= 400 else "ok"
+                with self.lock:
+                    self.latencies[k].append(seconds)
+                    self.outcomes[k][outcome] += 1
+            done += 1
+            if think:
+                time.sleep(rng.uniform(0, 2 * think))
+
+    def run(self, users: int, duration: float, max_requests: int = 0, think_ms: float = 0.0) -> dict:
+        deadline = time.monotonic() + duration
+        threads = [threading.Thread(target=self._user, args=(n, deadline, max_requests, think_ms / 1000),
+                                    daemon=True) for n in range(users)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return self.report(time.perf_counter() - t0, users)
+
+    def report(self, elapsed: float, users: int) -> dict:
+        kinds = {}
+        for kind, values in sorted(self.latencies.items()):
+            lat = sorted(values)
+            counts = self.outcomes[kind]
+            kinds[kind] = {
+                "requests": len(lat),
+                "p50_ms": round(percentile(lat, 50) * 1000, 1),
+                "p90_ms": round(percentile(lat, 90) * 1000, 1),
+                "p95_ms": round(percentile(lat, 95) * 1000, 1),
+                "p99_ms": round(percentile(lat, 99) * 1000, 1),
+                "max_ms": round(lat[-1] * 1000, 1),
+                "rejected": counts["rejected"],
+                "errors": counts["error"],
+                "error_rate": round(counts["error"] / len(lat), 4),
+            }
+        total = sum(k["requests"] for k in kinds.values())
+        errors = sum(k["errors"] for k in kinds.values())
+        return {
+            "users": users,
+            "seconds": round(elapsed, 2),
+            "requests": total,
+            "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "kinds": kinds,
+        }
+
+
+def load_pools(term=None):
+    """Student, section and course ids to draw requests from."""
+    from data_models import DEFAULT_TERM, Section, Student
+    from database import SessionLocal, init_db
+
+    init_db()
+    sess = SessionLocal()
+    try:
+        students = [sid for (sid,) in sess.query(Student.student_id)]
+        sections = sess.query(Section.id, Section.course_id).filter(Section.term == (term or DEFAULT_TERM)).all()
+    finally:
+        sess.close()
+    if not students or not sections:
+        raise SystemExit("❌ No students or sections in the database — seed it first.")
+    return students, [s for s, _c in sections], sorted({c for _s, c in sections})
+
+
+def print_report(report: dict, lock_report: dict = None):
+    print(f"\n📊 {report['requests']} requests from {report['users']} users in {report['seconds']}s "
+          f"→ {report['throughput_rps']} req/s, error rate {report['error_rate']:.2%}")
+    print(f"{'kind':<10}{'n':>7}{'p50':>9}{'p90':>9}{'p95':>9}{'p99':>9}{'max':>10}{'4xx':>6}{'5xx':>6}")
+    for kind, k in report["kinds"].items():
+        print(f"{kind:<10}{k['requests']:>7}{k['p50_ms']:>9}{k['p90_ms']:>9}{k['p95_ms']:>9}"
+              f"{k['p99_ms']:>9}{k['max_ms']:>10}{k['rejected']:>6}{k['errors']:>6}")
+    if lock_report:
+        print(f"🔒 DB writes: {lock_report['write_statements']} statements, {lock_report['lock_waits']} waited "
+              f"≥{LOCK_WAIT_MS} ms (total {lock_report['lock_wait_total_s']}s), p95 {lock_report['write_p95_ms']} ms, "
+              f"max {lock_report['write_max_ms']} ms, 'database is locked' errors: {lock_report['lock_errors']}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default=None, help="drive a running server instead of the in-process test client")
+    ap.add_argument("--db", default="ai_schedule.db", help="SQLite file copied for in-process runs")
+    ap.add_argument("--users", type=int, default=10, help="concurrent simulated registrants")
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds to run")
+    ap.add_argument("--requests", type=int, default=0, help="max requests per user (0 = until duration)")
+    ap.add_argument("--think-ms", type=float, default=0.0, help="mean pause between a user's requests")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help=f"kind=weight list, kinds: {', '.join(REQUEST_KINDS)}")
+    ap.add_argument("--term", default=None)
+    ap.add_argument("--force-refresh", action="store_true", help="generate requests bypass the run cache")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", default=None, help="also write the report to this file")
+    args = ap.parse_args()
+
+    mix = parse_mix(args.mix)
+    workdir = None
+    if args.url is None and "SCHEDULER_DB_URI" not in os.environ:
+        workdir = tempfile.mkdtemp(prefix="loadtest_")
+        shutil.copy(args.db, os.path.join(workdir, "db.sqlite"))
+        os.environ["SCHEDULER_DB_URI"] = f"sqlite:///{os.path.join(workdir, 'db.sqlite')}"
+        print(f"🧪 Using a copy of {args.db} in {workdir}")
+
+    students, sections, courses = load_pools(args.term)
+    probe = None
+    if args.url:
+        transport = HttpTransport(args.url)
+    else:
+        from database import engine
+        transport = TestClientTransport()
+        probe = LockProbe(engine)
+
+    test = LoadTest(transport, mix, students, sections, courses, args.term, args.force_refresh, args.seed)
+    print(f"🚦 {args.users} users, {args.duration}s, mix {mix}")
+    report = test.run(args.users, args.duration, args.requests, args.think_ms)
+    lock_report = probe.report() if probe else None
+    print_report(report, lock_report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({**report, "db": lock_report}, f, indent=2)
+        print(f"📝 Report written to {args.json}")
+    if workdir:
+        shutil.rmtree(workdir, ignore_errors=True)
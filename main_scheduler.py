@@ -1,90 +1,252 @@
 # main_scheduler.py
+import random
+import threading
+import time
 import pandas as pd
 from collections import defaultdict
-from database import init_db, SessionLocal, get_all_students, get_all_sections
-from eligibility_engine import make_eligibility_snapshot
-from prediction_engine import load_rf, train_rf, predict_demand
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.orm import selectinload
+from database import (init_db, SessionLocal, get_all_students, get_all_sections, held_seats,
+                      latest_assignment_ids, sync_enrollment_counts)
+from eligibility_engine import is_eligible, make_eligibility_snapshot
+from prediction_engine import load_rf, train_rf, catalog_from_sections, predict_course_demand
 from ga_optimizer import GAOptimizer
 from constraint_solver import cp_refine_schedule
-from data_models import Assignment, Preference, Section
+from flow_assignment import flow_assign, is_capacity_only, runnable_sections
+from lns_optimizer import LNSOptimizer
+from data_models import DEFAULT_TERM, Assignment, Course, Faculty, Preference, ScheduleRun, Section, Student
+from run_cache import input_fingerprint, find_cached_run, run_result
+from problem_snapshot import ProblemSnapshot, section_records
 
-def generate_schedule():
-    init_db()
-    sess = SessionLocal()
+# one run per term at a time; different terms run side by side
+_term_locks = defaultdict(threading.Lock)
+_term_locks_guard = threading.Lock()
+
+def _term_lock(term):
+    with _term_locks_guard:
+        return _term_locks[term]
+
+def resolve_demand_model(sections, term=DEFAULT_TERM):
+    """The saved demand model, or a fallback trained (and saved) from the term's section capacities."""
+    try:
+        return load_rf()
+    except:
+        hist = pd.DataFrame({
+            "semester": [term] * len(sections),
+            "course_id": [sec.course_id for sec in sections],
+            "enrollment": [min(45, sec.capacity if sec.capacity else 40) for sec in sections],
+            })
+        return train_rf(hist)
+
+def predict_term_demand(sess, sections, term=DEFAULT_TERM):
+    """{course_id: predicted enrollment} for the term's courses (trains a fallback model if none is saved)."""
+    model = resolve_demand_model(sections, term)
+    catalog = catalog_from_sections(sections, sess.query(Course).all())
+    return predict_course_demand(model, term, catalog)
 
+def build_snapshot(sess, seed=None, term=DEFAULT_TERM) -> ProblemSnapshot:
+    """Collect everything the optimizers need for one term from the DB into a ProblemSnapshot."""
     students = get_all_students(sess)
-    sections = get_all_sections(sess)
+    sections = get_all_sections(sess, term)
 
     # 1) Eligibility & priority
     snap = make_eligibility_snapshot(sess)
     eligible_students = [s for s in students if snap[s.student_id]["eligible"]]
     priomap = {s.student_id: snap[s.student_id]["priority"] for s in eligible_students}
 
-    import pandas as pd
-    n = len(sections)
-    if n == 0:
-                raise ValueError("No sections found in database — please seed your data first.")
+    if not sections:
+        raise ValueError(f"No sections found for term {term} — please seed your data first.")
 
-    hist = pd.DataFrame({
-        "semester": ["Spring"] * n,
-        "course_id": [sec.course_id for sec in sections],
-        "enrollment": [min(45, sec.capacity if sec.capacity else 40) for sec in sections],
-        })
-    try:
-        model = load_rf()
-    except:
-        model = train_rf(hist)
-    upcoming = pd.DataFrame({"semester":["Spring"]*len(sections), "course_id":[s.course_id for s in sections]})
-    demand_pred = predict_demand(model, upcoming)
-    demand_weight = {sec.course_id: float(d) for sec, d in zip(sections, demand_pred)}
+    # 2) Demand prediction
+    demand_weight = predict_term_demand(sess, sections, term)
+
+    # 3) Preferences
+    prefs = (sess.query(Preference).filter(Preference.term == term)
+             .options(selectinload(Preference.choices), selectinload(Preference.student)).all())
+
+    # unseeded runs still record the seed they used, so any run can be replayed
+    if seed is None:
+        seed = random.SystemRandom().randrange(2**31)
+    # seats held by students this run does not re-seat (e.g. reserved before
+    # losing eligibility) stay taken
+    held = held_seats(sess, term, exclude_student_ids=[s.id for s in eligible_students])
+    return ProblemSnapshot.from_orm(eligible_students, sections, prefs, priomap, demand_weight, seed,
+                                    faculty=sess.query(Faculty).all(), held=held)
+
+ENGINES = ("ga", "flow", "lns")
+
+def solve_snapshot(problem: ProblemSnapshot, generations=60, pop_size=30,
+                   weights=None, selection="weighted", engine="ga", time_limit=10.0, initial=None,
+                   deterministic=False):
+    """
+    Solve a snapshot. Needs no database, so it also serves offline replay.
+    engine: 'ga' (GA + CP repair), 'flow' (exact min-cost flow; if faculty load
+            or room clashes can bind, a section-level CP picks the runnable
+            sections and the flow is re-run on them) or 'lns'
+            (large-neighborhood search, returns best found by time_limit)
+    weights / selection: objective weights and GA ranking mode (see scoring.py)
+    initial: {student_id: section_id} the 'lns' engine starts from (e.g. the
+             previous schedule); defaults to the min-cost-flow result
+    deterministic: solve the CP repair single-threaded with the snapshot's seed,
+                   so the run can be reproduced exactly (explicitly seeded runs, replay)
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine '{engine}' (expected one of {ENGINES})")
 
-    # 3) Preferences map
-    prefs = {p.student.student_id: p for p in sess.query(Preference).all()}
+    if engine == "lns":
+        if not initial:
+            initial = flow_assign(problem.students, problem.sections, problem.preference_map(),
+                                  problem.priomap, problem.demand_weight, faculty=problem.faculty,
+                                  weights=weights)
+        lns = LNSOptimizer(problem.sections, problem.preference_map(), problem.priomap,
+                           problem.demand_weight, faculty=problem.faculty, weights=weights,
+                           seed=problem.seed, time_limit=time_limit)
+        return lns.run(problem.students, initial=initial)
+
+    if engine == "flow":
+        flow_solution = flow_assign(problem.students, problem.sections, problem.preference_map(),
+                                    problem.priomap, problem.demand_weight,
+                                    faculty=problem.faculty, weights=weights)
+        if is_capacity_only(problem.sections, problem.faculty):
+            return flow_solution
+        # close as few used sections as faculty load / room clashes demand, then re-flow
+        runnable = runnable_sections(problem.sections, problem.faculty, flow_solution)
+        print(f"ℹ️ Faculty load / room clashes present — re-solving flow on {len(runnable)}/"
+              f"{len(problem.sections)} runnable sections.")
+        return flow_assign(problem.students, runnable, problem.preference_map(), problem.priomap,
+                           problem.demand_weight, faculty=problem.faculty, weights=weights)
 
     # 4) GA
-    ga = GAOptimizer(sections, prefs, priomap, demand_weight)
-    ga_solution = ga.run(eligible_students)
+    ga = GAOptimizer(problem.sections, problem.preference_map(), problem.priomap,
+                     problem.demand_weight, seed=problem.seed, weights=weights, selection=selection)
+    ga_solution = ga.run(problem.students, generations=generations, pop_size=pop_size)
 
     # 5) CP refine/validate
-    repaired = cp_refine_schedule(eligible_students, sections, ga_solution)
+    return cp_refine_schedule(problem.students, problem.sections, ga_solution, faculty=problem.faculty,
+                              seed=problem.seed if deterministic else None)
+
+def generate_schedule(snapshot_path=None, seed=None, weights=None, selection="weighted", engine="ga",
+                      time_limit=10.0, force_refresh=False, term=DEFAULT_TERM):
+    """
+    snapshot_path: if given, dump the problem snapshot (.npz) there before solving
+    seed: RNG seed for the GA (random if None; recorded in the snapshot either way);
+          an explicit seed also makes the CP repair deterministic
+    weights / selection: objective weights and GA ranking mode (see scoring.py)
+    engine: solver pipeline, one of ENGINES
+    time_limit: wall-clock budget for the 'lns' engine (seconds)
+    force_refresh: solve even if an identical run is cached (see run_cache.py)
+    term: term to schedule; only that term's sections, preferences and assignments are touched
+    """
+    init_db()
+    with _term_lock(term):
+        sess = SessionLocal()
+        try:
+            return _generate_term(sess, term, snapshot_path, seed, weights, selection, engine,
+                                  time_limit, force_refresh)
+        finally:
+            sess.close()
+
+def _generate_term(sess, term, snapshot_path, seed, weights, selection, engine, time_limit, force_refresh):
+    config = {"engine": engine, "weights": weights, "selection": selection,
+              "time_limit": time_limit, "seed": seed, "term": term}
+    # a missing model is trained here, before fingerprinting, so the stored
+    # fingerprint carries the version of the model the run actually used
+    resolve_demand_model(get_all_sections(sess, term), term)
+    fingerprint = input_fingerprint(sess, config, term=term)
+    cached = None if force_refresh or snapshot_path else find_cached_run(sess, fingerprint, term=term)
+    if cached:
+        print(f"♻️ Inputs unchanged — returning cached run #{cached.id} for {term} (seed={cached.seed})")
+        return run_result(sess, cached)
+
+    problem = build_snapshot(sess, seed=seed, term=term)
+    if snapshot_path:
+        problem.save(snapshot_path)
+        print(f"📦 Problem snapshot saved to {snapshot_path} (seed={problem.seed})")
+
+    previous = _current_schedule(sess, term) if engine == "lns" else None
+    repaired = solve_snapshot(problem, weights=weights, selection=selection, engine=engine,
+                              time_limit=time_limit, initial=previous, deterministic=seed is not None)
 
     # 6) Save Assignments
-    for stu in eligible_students:
-        sec_id = repaired.get(stu.student_id)
-        assign = Assignment(student=stu, section_id=sec_id, status="assigned" if sec_id else "not_assigned")
+    run = ScheduleRun(term=term, fingerprint=fingerprint, engine=engine, seed=problem.seed,
+                      created_at=time.time())
+    sess.add(run)
+    stu_by_sid = {s.student_id: s for s in get_all_students(sess)}
+    for rec in problem.students:
+        sec_id = repaired.get(rec.student_id)
+        assign = Assignment(term=term, student=stu_by_sid[rec.student_id], section_id=sec_id, run=run,
+                            status="assigned" if sec_id else "not_assigned")
         sess.add(assign)
+    sess.flush()
+    sync_enrollment_counts(sess, term)
     sess.commit()
-    sess.close()
     return repaired
 
+def _current_schedule(sess, term):
+    """{student_id: section_id} of the students currently seated in the term."""
+    rows = (
+        sess.query(Student.student_id, Assignment.section_id)
+        .join(Assignment, Assignment.student_id == Student.id)
+        .filter(Assignment.id.in_(latest_assignment_ids(sess, term)), Assignment.status == "assigned")
+    )
+    return {sid: sec_id for sid, sec_id in rows if sec_id is not None}
+
+def generate_terms(terms, max_workers=None, **kwargs):
+    """
+    Run generate_schedule for several terms (or campuses) concurrently.
+    Each run reads and writes only its own term's rows. Returns {term: result}.
+    """
+    terms = list(dict.fromkeys(terms))
+    with ThreadPoolExecutor(max_workers=max_workers or len(terms) or 1) as pool:
+        futures = {t: pool.submit(generate_schedule, term=t, **kwargs) for t in terms}
+        return {t: f.result() for t, f in futures.items()}
+
 # Targeted re-optimization for affected students
-def run_dynamic_reoptimizer(affected_student_ids):
+def run_dynamic_reoptimizer(affected_student_ids, course_ids=None, term=DEFAULT_TERM, unseat_ids=()):
+    """
+    affected_student_ids: external student ids to re-seat (ineligible ones are only unseated)
+    course_ids: optional course group; limits candidate sections to those courses
+    term: term whose seats are re-optimized
+    unseat_ids: external student ids that give up their seat (drop / seat release)
+    """
     sess = SessionLocal()
-    students = [s for s in sess.query(Student).all() if s.student_id in affected_student_ids]
-    sections = sess.query(Section).all()
-
-    # simple: unassign their current sections first
-    for a in sess.query(Assignment).all():
-        if a.student.student_id in affected_student_ids:
-            a.section_id = None
-            a.status = "not_assigned"
-    sess.commit()
+    unseat_ids = set(unseat_ids)
+    affected = sess.query(Student).filter(
+        Student.student_id.in_(list(set(affected_student_ids) | unseat_ids))).all()
+    students = [s for s in affected if s.student_id not in unseat_ids and is_eligible(s)]
+    leaving = [s for s in affected if s not in students]
+    sections_q = sess.query(Section).filter(Section.term == term)
+    if course_ids:
+        sections_q = sections_q.filter(Section.course_id.in_(list(course_ids)))
+    sections = sections_q.all()
+
+    # their current seats are freed by the new rows written below (latest row
+    # wins); everyone else keeps their seat (optimizer runs and reservations alike)
+    held = held_seats(sess, term, exclude_student_ids=[s.id for s in affected])
+    sections = section_records(sections, held)
 
     # reuse GA lightly with only affected students
     snap = make_eligibility_snapshot(sess)
     priomap = {s.student_id: snap[s.student_id]["priority"] for s in students}
-    prefs = {p.student.student_id: p for p in sess.query(Preference).filter(Preference.student_id.in_([s.id for s in students]))}
+    prefs = {p.student.student_id: p for p in sess.query(Preference).options(selectinload(Preference.choices))
+             .filter(Preference.term == term, Preference.student_id.in_([s.id for s in students]))}
     demand_weight = defaultdict(float)  # keep neutral
 
-    from ga_optimizer import GAOptimizer
-    ga = GAOptimizer(sections, prefs, priomap, demand_weight)
-    sol = ga.run(students, generations=20, pop_size=20)
-    repaired = cp_refine_schedule(students, sections, sol)
+    repaired = {}
+    if students:
+        from ga_optimizer import GAOptimizer
+        ga = GAOptimizer(sections, prefs, priomap, demand_weight)
+        sol = ga.run(students, generations=20, pop_size=20)
+        repaired = cp_refine_schedule(students, sections, sol, faculty=sess.query(Faculty).all())
 
-    for stu in students:
+    for stu in leaving:
+        repaired[stu.student_id] = None
+    for stu in affected:
         sec_id = repaired.get(stu.student_id)
-        a = Assignment(student=stu, section_id=sec_id, status="assigned" if sec_id else "not_assigned")
+        a = Assignment(term=term, student=stu, section_id=sec_id, status="assigned" if sec_id else "not_assigned")
         sess.add(a)
+    sess.flush()
+    sync_enrollment_counts(sess, term)
     sess.commit()
     sess.close()
     return repaired
@@ -0,0 +1,117 @@
+# model_registry.py
+"""
+Process-wide registry for demand-model artifacts.
+
+Artifacts are loaded once per process and reused until the file on disk
+changes. Two storage layouts are supported:
+- "compressed": zlib/lzma joblib file, smallest on disk
+- "mmap": uncompressed joblib file, loaded with mmap_mode="r" so the numpy
+  arrays (tree nodes) are paged in lazily and shared between workers through
+  the OS page cache
+
+How to run:
+    python model_registry.py --repack rf_demand.joblib --mode mmap
+"""
+
+import argparse
+import os
+import threading
+import time
+from typing import Dict
+
+from joblib import dump, load
+
+DEFAULT_MODEL_PATH = "rf_demand.joblib"
+
+_lock = threading.Lock()
+_cache: Dict[str, tuple] = {}    # abspath -> ((mtime_ns, size), model)
+_metrics: Dict[str, dict] = {}   # abspath -> size/load-time info
+
+# magic bytes of the compressors joblib can write; joblib's zlib output is a raw
+# zlib stream (0x78 header), uncompressed pickles start with 0x80
+_COMPRESSED_MAGIC = (b"\x78", b"ZF", b"\x1f\x8b", b"BZh", b"\xfd7zXZ", b"\x04\x22\x4d\x18")
+
+
+def _is_compressed(path: str) -> bool:
+    with open(path, "rb") as f:
+        head = f.read(6)
+    return any(head.startswith(m) for m in _COMPRESSED_MAGIC)
+
+
+def _file_key(path: str) -> tuple:
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+def model_version(path: str = DEFAULT_MODEL_PATH) -> str:
+    """Cheap identity of the artifact on disk ("<mtime_ns>-<size>"), or "missing"."""
+    try:
+        mtime_ns, size = _file_key(os.path.abspath(path))
+    except FileNotFoundError:
+        return "missing"
+    return f"{mtime_ns}-{size}"
+
+
+def save_model(model, path: str = DEFAULT_MODEL_PATH, mode: str = "compressed"):
+    """Write an artifact. mode: 'compressed' (small file) or 'mmap' (memory-mappable)."""
+    if mode == "compressed":
+        dump(model, path, compress=("zlib", 3))
+    elif mode == "mmap":
+        dump(model, path)
+    else:
+        raise ValueError(f"Unknown artifact mode '{mode}' (expected 'compressed' or 'mmap')")
+    with _lock:
+        _cache.pop(os.path.abspath(path), None)
+    return path
+
+
+def get_model(path: str = DEFAULT_MODEL_PATH):
+    """Return the model at path, loading it at most once per process (per file version)."""
+    key = os.path.abspath(path)
+    file_key = _file_key(key)   # raises FileNotFoundError like joblib.load did
+    with _lock:
+        cached = _cache.get(key)
+        if cached and cached[0] == file_key:
+            return cached[1]
+
+        compressed = _is_compressed(key)
+        t0 = time.perf_counter()
+        model = load(key, mmap_mode=None if compressed else "r")
+        elapsed = time.perf_counter() - t0
+
+        _cache[key] = (file_key, model)
+        _metrics[key] = {
+            "path": path,
+            "size_bytes": file_key[1],
+            "load_seconds": round(elapsed, 4),
+            "mmap": not compressed,
+            "loaded_at": time.time(),
+            "loads": _metrics.get(key, {}).get("loads", 0) + 1,
+        }
+        return model
+
+
+def model_metrics() -> Dict[str, dict]:
+    """Size and load-time info for every artifact loaded by this process."""
+    with _lock:
+        return {k: dict(v) for k, v in _metrics.items()}
+
+
+def clear_cache():
+    with _lock:
+        _cache.clear()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--repack", required=True, help="artifact to rewrite in place")
+    ap.add_argument("--mode", choices=["compressed", "mmap"], default="compressed")
+    args = ap.parse_args()
+
+    before = os.path.getsize(args.repack)
+    save_model(get_model(args.repack), args.repack, mode=args.mode)
+    clear_cache()
+    get_model(args.repack)
+    m = model_metrics()[os.path.abspath(args.repack)]
+    print(f"✅ Repacked {args.repack} as {args.mode}: {before} → {m['size_bytes']} bytes, "
+          f"load {m['load_seconds']:.3f}s")
@@ -1,14 +1,14 @@
 # prediction_engine.py
 import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
+from sklearn.ensemble import RandomForestRegressor, HistGradientBoostingRegressor
 from sklearn.preprocessing import OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
-from joblib import dump, load
+from model_registry import get_model, save_model
 
 # Train: historical_df columns → ['semester','course_id','enrollment']
-def train_rf(historical_df: pd.DataFrame, model_path="rf_demand.joblib"):
+def train_rf(historical_df: pd.DataFrame, model_path="rf_demand.joblib", n_jobs=-1):
     X = historical_df[['semester', 'course_id']]
     y = historical_df['enrollment'].astype(float)
 
@@ -18,15 +18,249 @@ def train_rf(historical_df: pd.DataFrame, model_path="rf_demand.joblib"):
         ],
         remainder='drop'
     )
-    rf = RandomForestRegressor(n_estimators=200, random_state=42)
+    rf = RandomForestRegressor(n_estimators=200, n_jobs=n_jobs, random_state=42)
     pipe = Pipeline(steps=[('prep', ct), ('rf', rf)])
     pipe.fit(X, y)
-    dump(pipe, model_path)
+    save_model(pipe, model_path)
     return pipe
 
 def load_rf(model_path="rf_demand.joblib"):
-    return load(model_path)
+    # cached per process by the registry; reloaded only if the file changes
+    return get_model(model_path)
 
 # Predict demand per section/course; output Series aligned with input rows
 def predict_demand(model, upcoming_df: pd.DataFrame) -> np.ndarray:
     return model.predict(upcoming_df[['semester','course_id']])
+
+
+# ==================================================
+# Batch forecasting subsystem
+# ==================================================
+# history_df columns → ['semester','course_id','enrollment'] plus optional
+# ['program','sections']; catalog_df → one row per course of the target term
+# with ['course_id'] plus optional ['program','level','credits','sections'].
+
+SEASON_ORDER = {"spring": 0, "summer": 1, "fall": 2, "autumn": 2}
+CATEGORICAL_FEATURES = ["program", "subject", "course_id"]
+NUMERIC_FEATURES = ["level", "credits", "sections", "lag1", "lag2", "hist_mean"]
+
+
+def term_key(semester) -> tuple:
+    """'Spring2025' → (2025, 0). Unparseable labels sort first."""
+    text = str(semester).strip().lower()
+    digits = "".join(c for c in text if c.isdigit())
+    season = next((v for k, v in SEASON_ORDER.items() if text.startswith(k)), 0)
+    return (int(digits) if digits else 0, season)
+
+
+def _course_level(course_id: str) -> int:
+    # "CSE 1110" → 1 (first digit of the course number)
+    digits = "".join(c for c in str(course_id) if c.isdigit())
+    return int(digits[0]) if digits else 1
+
+
+def _subject(course_id: str) -> str:
+    return str(course_id).split(" ")[0].strip().upper() or "UNK"
+
+
+def _aggregate_history(history_df: pd.DataFrame) -> pd.DataFrame:
+    """Collapse to one row per (semester, course_id); enrollment summed across programs."""
+    df = history_df.copy()
+    if "program" not in df.columns:
+        df["program"] = "UNK"
+    if "sections" not in df.columns:
+        df["sections"] = np.nan
+    df["enrollment"] = df["enrollment"].astype(float)
+    return (
+        df.groupby(["semester", "course_id"], as_index=False)
+        .agg(enrollment=("enrollment", "sum"), program=("program", "first"), sections=("sections", "sum"))
+    )
+
+
+def build_features(history_df: pd.DataFrame, catalog_df: pd.DataFrame = None,
+                   target_semester=None) -> pd.DataFrame:
+    """
+    Build the feature frame for every history row (and, if target_semester is
+    given, one extra row per catalog course for that term) in a single
+    vectorized pass: lags come from one sorted groupby/shift over all courses.
+    """
+    hist = _aggregate_history(history_df)
+    hist["_target"] = False
+
+    frames = [hist]
+    if target_semester is not None and catalog_df is not None:
+        tgt = catalog_df.drop_duplicates("course_id")[["course_id"]].copy()
+        tgt["semester"] = target_semester
+        tgt["enrollment"] = np.nan
+        tgt["_target"] = True
+        # the target term replaces any history rows of the same label
+        frames = [hist[hist["semester"] != target_semester], tgt]
+    df = pd.concat(frames, ignore_index=True)
+
+    # target rows sort after all history when their label carries no year
+    keys = df["semester"].map(term_key)
+    df["_year"] = [k[0] for k in keys]
+    df["_season"] = [k[1] for k in keys]
+    if target_semester is not None and term_key(target_semester)[0] == 0:
+        df.loc[df["_target"], "_year"] = df["_year"].max() + 1
+    df = df.sort_values(["course_id", "_year", "_season"], kind="stable")
+
+    grp = df.groupby("course_id")["enrollment"]
+    df["lag1"] = grp.shift(1)
+    df["lag2"] = grp.shift(2)
+    prev = df["lag1"]
+    df["hist_mean"] = (
+        prev.fillna(0).groupby(df["course_id"]).cumsum()
+        / prev.notna().groupby(df["course_id"]).cumsum().replace(0, np.nan)
+    )
+
+    # catalog attributes (level/credits/sections/program) override derived ones
+    df["level"] = df["course_id"].map(_course_level)
+    df["credits"] = 3
+    df["subject"] = df["course_id"].map(_subject)
+    if catalog_df is not None:
+        cat = catalog_df.drop_duplicates("course_id").set_index("course_id")
+        for col in ("level", "credits"):
+            if col in cat.columns:
+                df[col] = df["course_id"].map(cat[col]).fillna(df[col])
+        if "sections" in cat.columns:
+            is_tgt = df["_target"]
+            df.loc[is_tgt, "sections"] = df.loc[is_tgt, "course_id"].map(cat["sections"])
+        if "program" in cat.columns:
+            is_tgt = df["_target"]
+            df.loc[is_tgt, "program"] = df.loc[is_tgt, "course_id"].map(cat["program"])
+
+    # a target course inherits its last known program
+    df["program"] = df.groupby("course_id")["program"].ffill().fillna("UNK")
+    df["sections"] = df["sections"].fillna(0)
+    for col in ("lag1", "lag2", "hist_mean"):
+        df[col] = df[col].fillna(0.0)
+
+    return df.drop(columns=["_year", "_season"]).reset_index(drop=True)
+
+
+def _make_estimator(model_type: str, n_jobs: int, random_state: int):
+    if model_type == "rf":
+        return RandomForestRegressor(n_estimators=200, n_jobs=n_jobs, random_state=random_state)
+    if model_type == "hgb":
+        # HistGradientBoosting parallelizes through OpenMP; n_jobs does not apply
+        return HistGradientBoostingRegressor(max_iter=200, random_state=random_state)
+    raise ValueError(f"Unknown model_type '{model_type}' (expected 'rf' or 'hgb')")
+
+
+class DemandForecaster:
+    def __init__(self, model_type="hgb", n_jobs=-1, random_state=42):
+        """
+        Per-course enrollment forecaster.
+        ----------------------------------
+        model_type: 'hgb' (HistGradientBoosting, light & fast) or 'rf' (RandomForest)
+        n_jobs: parallel workers for RF training/prediction
+        """
+        self.model_type = model_type
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.history_ = None
+        self.pipeline_ = None
+
+    def fit(self, history_df: pd.DataFrame, catalog_df: pd.DataFrame = None):
+        feats = build_features(history_df, catalog_df)
+        ct = ColumnTransformer(
+            transformers=[
+                ('ohe', OneHotEncoder(handle_unknown='ignore', sparse_output=self.model_type != "hgb"),
+                 CATEGORICAL_FEATURES),
+                ('num', 'passthrough', NUMERIC_FEATURES),
+            ],
+            remainder='drop'
+        )
+        est = _make_estimator(self.model_type, self.n_jobs, self.random_state)
+        self.pipeline_ = Pipeline(steps=[('prep', ct), ('model', est)])
+        self.pipeline_.fit(feats[CATEGORICAL_FEATURES + NUMERIC_FEATURES], feats["enrollment"])
+        self.history_ = _aggregate_history(history_df)
+        # without historic section counts the feature is all zeros in training,
+        # so it must stay zero at prediction time too
+        self.has_sections_ = "sections" in history_df.columns
+        return self
+
+    def predict_term(self, semester, catalog_df: pd.DataFrame) -> pd.Series:
+        """One batch predict for every course of the term → Series indexed by course_id."""
+        if self.pipeline_ is None:
+            raise ValueError("DemandForecaster is not fitted")
+        if not self.has_sections_:
+            catalog_df = catalog_df.drop(columns=["sections"], errors="ignore")
+        feats = build_features(self.history_, catalog_df, target_semester=semester)
+        tgt = feats[feats["_target"]]
+        pred = self.pipeline_.predict(tgt[CATEGORICAL_FEATURES + NUMERIC_FEATURES])
+        return pd.Series(np.clip(pred, 0, None), index=tgt["course_id"].values, name="demand")
+
+
+def train_forecaster(history_df: pd.DataFrame, catalog_df: pd.DataFrame = None,
+                     model_type="hgb", n_jobs=-1, model_path="rf_demand.joblib"):
+    model = DemandForecaster(model_type=model_type, n_jobs=n_jobs).fit(history_df, catalog_df)
+    if model_path:
+        save_model(model, model_path)
+    return model
+
+
+def add_trees(model, history_df: pd.DataFrame, semester, n_new_trees=50):
+    """
+    Grow a fitted random forest by n_new_trees trees trained on one term's rows
+    (warm_start); the existing trees and the fitted encoder are kept as they are.
+    model: legacy (semester, course_id) pipeline or DemandForecaster(model_type='rf')
+    history_df: full history, already including the semester's rows
+    Raises ValueError for models that cannot be grown (HistGradientBoosting re-bins
+    its inputs on every fit, so it is always retrained from scratch).
+    """
+    if isinstance(model, DemandForecaster):
+        if model.model_type != "rf":
+            raise ValueError(f"Cannot add trees to a '{model.model_type}' forecaster")
+        feats = build_features(history_df)
+        rows = feats[feats["semester"] == semester]
+        X, y, pipe = rows[CATEGORICAL_FEATURES + NUMERIC_FEATURES], rows["enrollment"], model.pipeline_
+    else:
+        rows = history_df[history_df["semester"] == semester]
+        X, y, pipe = rows[['semester', 'course_id']], rows['enrollment'].astype(float), model
+    if rows.empty:
+        raise ValueError(f"No history rows for {semester}")
+
+    forest = pipe.steps[-1][1]
+    if not isinstance(forest, RandomForestRegressor):
+        raise ValueError(f"Cannot add trees to {type(forest).__name__}")
+    # transform with the fitted encoder only; Pipeline.fit would refit it and
+    # change the feature layout under the existing trees
+    Xt = pipe[:-1].transform(X)
+    forest.set_params(warm_start=True, n_estimators=len(forest.estimators_) + n_new_trees)
+    forest.fit(Xt, y)
+    forest.set_params(warm_start=False)
+    if isinstance(model, DemandForecaster):
+        model.history_ = _aggregate_history(history_df)
+    return model
+
+
+def n_trees(model) -> int:
+    """Number of trees in a forest-based demand model (0 for other models)."""
+    pipe = model.pipeline_ if isinstance(model, DemandForecaster) else model
+    est = pipe.steps[-1][1]
+    return len(getattr(est, "estimators_", []))
+
+
+def catalog_from_sections(sections, courses=None) -> pd.DataFrame:
+    """Per-course catalog for a term from Section (and optional Course) rows."""
+    counts = {}
+    for sec in sections:
+        counts[sec.course_id] = counts.get(sec.course_id, 0) + 1
+    cat = pd.DataFrame({"course_id": list(counts), "sections": list(counts.values())})
+    if courses:
+        meta = {c.id: (c.level, c.credits) for c in courses}
+        cat["level"] = [meta.get(cid, (None, None))[0] for cid in cat["course_id"]]
+        cat["credits"] = [meta.get(cid, (None, None))[1] for cid in cat["course_id"]]
+    return cat
+
+
+def predict_course_demand(model, semester, catalog_df: pd.DataFrame) -> dict:
+    """{course_id: demand} — one prediction per course, whatever the model kind."""
+    if isinstance(model, DemandForecaster):
+        return {str(k): float(v) for k, v in model.predict_term(semester, catalog_df).items()}
+    # legacy (semester, course_id) pipeline
+    courses = catalog_df["course_id"].drop_duplicates().tolist()
+    upcoming = pd.DataFrame({"semester": [semester] * len(courses), "course_id": courses})
+    return {cid: float(d) for cid, d in zip(courses, predict_demand(model, upcoming))}
@@ -0,0 +1,184 @@
+# problem_snapshot.py
+"""
+Problem snapshots for offline replay.
+
+A snapshot is a frozen, DB-free copy of everything generate_schedule feeds
+into the optimizers: eligible students, sections, preferences, priorities,
+predicted demand, faculty load limits, ranked section choices and the RNG seed. It is written as a
+single compressed .npz file (plain numpy arrays, no pickles) so a slow or bad
+production run can be replayed, profiled and tuned without touching the live
+database.
+"""
+
+from collections import namedtuple
+from typing import Dict, List, Optional
+
+import numpy as np
+
+SNAPSHOT_VERSION = 3
+
+# Lightweight stand-ins for the ORM rows; attribute names match data_models so
+# GAOptimizer / cp_refine_schedule accept them unchanged.
+StudentRec = namedtuple("StudentRec", ["student_id", "cgpa", "level", "department"])
+SectionRec = namedtuple(
+    "SectionRec",
+    ["id", "course_id", "code", "day", "start_time", "end_time", "room", "capacity", "faculty_id"],
+)
+PreferenceRec = namedtuple("PreferenceRec",
+                           ["student_id", "course_id", "preferred_sections", "time_pref", "choices"])
+PreferenceRec.__new__.__defaults__ = ((),)   # choices: ((section_id, rank), ...)
+FacultyRec = namedtuple("FacultyRec", ["id", "max_load", "available"])
+
+
+def _str_array(values) -> np.ndarray:
+    # fixed-width unicode keeps the file loadable with allow_pickle=False
+    return np.array(["" if v is None else str(v) for v in values], dtype=str)
+
+
+def _none_if_empty(v: str):
+    return v if v != "" else None
+
+
+def section_records(sections, held: Optional[Dict[int, int]] = None) -> List[SectionRec]:
+    """
+    SectionRec copies of Section rows.
+    held: {section_id: seats already taken by students outside the solve}; subtracted from capacity
+    """
+    held = held or {}
+    return [
+        SectionRec(sec.id, sec.course_id, sec.code, sec.day, sec.start_time, sec.end_time,
+                   sec.room, max(int(sec.capacity or 0) - held.get(sec.id, 0), 0), sec.faculty_id)
+        for sec in sections
+    ]
+
+
+class ProblemSnapshot:
+    def __init__(self, students: List[StudentRec], sections: List[SectionRec],
+                 preferences: List[PreferenceRec], priomap: Dict[str, float],
+                 demand_weight: Dict[str, float], seed: Optional[int] = None,
+                 faculty: Optional[List[FacultyRec]] = None):
+        """
+        students: eligible students only (what the optimizers see)
+        sections: all sections of the term
+        preferences: one record per (student, course) preference row
+        priomap: {student_id: priority weight}
+        demand_weight: {course_id: predicted demand}
+        seed: RNG seed used for the run
+        faculty: faculty load limits (max_load, available)
+        """
+        self.students = students
+        self.sections = sections
+        self.preferences = preferences
+        self.priomap = priomap
+        self.demand_weight = demand_weight
+        self.seed = seed
+        self.faculty = faculty or []
+
+    # ------------------------------------------------------
+    # Build from live ORM objects
+    # ------------------------------------------------------
+    @classmethod
+    def from_orm(cls, students, sections, preferences, priomap, demand_weight, seed=None, faculty=(),
+                 held=None):
+        """held: {section_id: seats kept by students outside the solve} (see section_records)"""
+        stu_recs = [
+            StudentRec(s.student_id, float(s.cgpa or 0.0), int(s.level or 1), s.department)
+            for s in students
+        ]
+        sec_recs = section_records(sections, held)
+        pref_recs = [
+            PreferenceRec(p.student.student_id, p.course_id, p.preferred_sections, p.time_pref,
+                          tuple((c.section_id, c.rank) for c in p.choices))
+            for p in preferences
+        ]
+        fac_recs = [FacultyRec(f.id, f.max_load, bool(f.available)) for f in faculty]
+        return cls(stu_recs, sec_recs, pref_recs, dict(priomap), dict(demand_weight), seed, fac_recs)
+
+    def preference_map(self) -> Dict[str, PreferenceRec]:
+        """{student_id: preference} — last row wins, same as generate_schedule."""
+        return {p.student_id: p for p in self.preferences}
+
+    # ------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------
+    def save(self, path: str):
+        stu_ids = [s.student_id for s in self.students]
+        demand_courses = sorted(self.demand_weight)
+        choice_rows = [(n, sec_id, rank) for n, p in enumerate(self.preferences) for sec_id, rank in p.choices]
+        np.savez_compressed(
+            path,
+            version=np.array(SNAPSHOT_VERSION),
+            seed=np.array(-1 if self.seed is None else self.seed, dtype=np.int64),
+            # students
+            stu_id=_str_array(stu_ids),
+            stu_cgpa=np.array([s.cgpa for s in self.students], dtype=np.float64),
+            stu_level=np.array([s.level for s in self.students], dtype=np.int32),
+            stu_dept=_str_array(s.department for s in self.students),
+            stu_priority=np.array([self.priomap.get(sid, 0.0) for sid in stu_ids], dtype=np.float64),
+            # sections
+            sec_id=np.array([s.id for s in self.sections], dtype=np.int64),
+            sec_course=_str_array(s.course_id for s in self.sections),
+            sec_code=_str_array(s.code for s in self.sections),
+            sec_day=_str_array(s.day for s in self.sections),
+            sec_start=_str_array(s.start_time for s in self.sections),
+            sec_end=_str_array(s.end_time for s in self.sections),
+            sec_room=_str_array(s.room for s in self.sections),
+            sec_capacity=np.array([s.capacity for s in self.sections], dtype=np.int32),
+            sec_faculty=np.array([-1 if s.faculty_id is None else s.faculty_id for s in self.sections],
+                                 dtype=np.int64),
+            # preferences
+            pref_student=_str_array(p.student_id for p in self.preferences),
+            pref_course=_str_array(p.course_id for p in self.preferences),
+            pref_sections=_str_array(p.preferred_sections for p in self.preferences),
+            pref_time=_str_array(p.time_pref for p in self.preferences),
+            # ranked choices (row index into the preference arrays)
+            choice_pref=np.array([r[0] for r in choice_rows], dtype=np.int64),
+            choice_section=np.array([r[1] for r in choice_rows], dtype=np.int64),
+            choice_rank=np.array([r[2] for r in choice_rows], dtype=np.int32),
+            # faculty (max_load -1 = unlimited)
+            fac_id=np.array([f.id for f in self.faculty], dtype=np.int64),
+            fac_max_load=np.array([-1 if f.max_load is None else f.max_load for f in self.faculty],
+                                  dtype=np.int32),
+            fac_available=np.array([f.available for f in self.faculty], dtype=bool),
+            # demand
+            demand_course=_str_array(demand_courses),
+            demand_value=np.array([self.demand_weight[c] for c in demand_courses], dtype=np.float64),
+        )
+
+    @classmethod
+    def load(cls, path: str) -> "ProblemSnapshot":
+        with np.load(path, allow_pickle=False) as z:
+            version = int(z["version"])
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f"Unsupported snapshot version {version} (expected {SNAPSHOT_VERSION})")
+            seed = int(z["seed"])
+
+            students = [
+                StudentRec(str(sid), float(cgpa), int(level), _none_if_empty(str(dept)))
+                for sid, cgpa, level, dept in zip(z["stu_id"], z["stu_cgpa"], z["stu_level"], z["stu_dept"])
+            ]
+            priomap = {str(sid): float(p) for sid, p in zip(z["stu_id"], z["stu_priority"])}
+            sections = [
+                SectionRec(int(i), str(c), str(code), _none_if_empty(str(day)),
+                           _none_if_empty(str(st)), _none_if_empty(str(et)), _none_if_empty(str(room)),
+                           int(cap), None if fac < 0 else int(fac))
+                for i, c, code, day, st, et, room, cap, fac in zip(
+                    z["sec_id"], z["sec_course"], z["sec_code"], z["sec_day"], z["sec_start"],
+                    z["sec_end"], z["sec_room"], z["sec_capacity"], z["sec_faculty"])
+            ]
+            choices = [[] for _ in z["pref_student"]]
+            for n, sec_id, rank in zip(z["choice_pref"], z["choice_section"], z["choice_rank"]):
+                choices[int(n)].append((int(sec_id), int(rank)))
+            preferences = [
+                PreferenceRec(str(sid), str(c), str(ps), str(tp), tuple(ch))
+                for sid, c, ps, tp, ch in zip(z["pref_student"], z["pref_course"], z["pref_sections"],
+                                              z["pref_time"], choices)
+            ]
+            demand_weight = {str(c): float(v) for c, v in zip(z["demand_course"], z["demand_value"])}
+            faculty = [
+                FacultyRec(int(i), None if ml < 0 else int(ml), bool(av))
+                for i, ml, av in zip(z["fac_id"], z["fac_max_load"], z["fac_available"])
+            ]
+
+        return cls(students, sections, preferences, priomap, demand_weight,
+                   None if seed < 0 else seed, faculty)
@@ -0,0 +1,203 @@
+# reopt_queue.py
+"""
+Debounced batch queue in front of run_dynamic_reoptimizer.
+
+Seat changes (seat release, drop, add, eligibility change) are queued as
+events. A single worker thread waits until the burst goes quiet (window) or
+the oldest event has waited max_delay, coalesces everything collected into
+course groups — courses linked by a shared student — and runs ONE
+re-optimization per group. Each caller gets a Future that resolves to the
+assignments of the students it asked about once its batch finishes.
+
+Only the worker writes to the database, so concurrent /api/reopt calls no
+longer start overlapping GA+CP runs that fight over the SQLite lock. Events
+of different terms never share a group; each group re-optimizes one term.
+"""
+
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import Future
+from typing import Callable, Dict, Iterable, List, Optional
+
+EVENT_KINDS = ("seat_release", "drop", "add", "eligibility_change")
+
+ReoptEvent = namedtuple("ReoptEvent", ["kind", "student_id", "course_id", "term"])
+ReoptEvent.__new__.__defaults__ = (None, None, None)   # term None = DEFAULT_TERM
+
+
+def waiting_students(course_ids: Iterable[str], term: Optional[str] = None) -> List[str]:
+    """Students with a preference for one of the courses in the term and no current section."""
+    from database import SessionLocal, latest_assignment_ids
+    from data_models import DEFAULT_TERM, Assignment, Preference, Student
+
+    term = term or DEFAULT_TERM
+    sess = SessionLocal()
+    try:
+        prefs = (
+            sess.query(Student.student_id, Student.id)
+            .join(Preference, Preference.student_id == Student.id)
+            .filter(Preference.term == term, Preference.course_id.in_(list(course_ids)))
+            .all()
+        )
+        seated = {
+            sid for (sid,) in sess.query(Assignment.student_id)
+            .filter(Assignment.id.in_(latest_assignment_ids(sess, term)), Assignment.status == "assigned",
+                    Assignment.student_id.in_([pk for _, pk in prefs]))
+        }
+        return sorted({sid for sid, pk in prefs if pk not in seated})
+    finally:
+        sess.close()
+
+
+def group_events(events: List[ReoptEvent], resolve_waiting: Callable = waiting_students) -> List[tuple]:
+    """
+    Coalesce events into [(student_ids, course_ids, unseat_ids)] groups.
+    student_ids are (re)seated; unseat_ids — students who dropped or released
+    a seat — only lose theirs. A freed seat (drop, seat_release) pulls in the
+    students still waiting for its course. Courses are merged when one student
+    touches both; events without a course form their own group.
+    """
+    parent = {}
+
+    def find(k):
+        while parent.setdefault(k, k) != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    def union(a, b):
+        parent[find(a)] = find(b)
+
+    releases, leaving = set(), set()
+    for ev in events:
+        if ev.kind in ("drop", "seat_release") and ev.student_id:
+            leaving.add(ev.student_id)
+    for ev in events:
+        s_key = None
+        if ev.student_id:
+            s_key = ("d", ev.student_id) if ev.student_id in leaving else ("s", ev.student_id)
+        c_key = ("c", ev.course_id) if ev.course_id else None
+        if s_key and c_key:
+            union(s_key, c_key)
+        for k in (s_key, c_key):
+            if k:
+                find(k)
+        if ev.kind in ("drop", "seat_release") and ev.course_id:
+            releases.add(ev.course_id)
+
+    # a freed seat pulls in the students still waiting for that course
+    for course in sorted(releases):
+        for sid in resolve_waiting([course]):
+            if sid not in leaving:
+                union(("s", sid), ("c", course))
+
+    groups = {}
+    for key in list(parent):
+        root = find(key)
+        stu, crs, gone = groups.setdefault(root, (set(), set(), set()))
+        {"s": stu, "c": crs, "d": gone}[key[0]].add(key[1])
+    return [(sorted(s), sorted(c), sorted(d)) for s, c, d in groups.values() if s or d]
+
+
+class ReoptQueue:
+    def __init__(self, reoptimize: Optional[Callable] = None, window: float = 0.25, max_delay: float = 2.0,
+                 resolve_waiting: Callable = waiting_students):
+        """
+        reoptimize: callable(student_ids, course_ids=..., term=..., unseat_ids=...) → {student_id: section_id}
+                    (default: main_scheduler.run_dynamic_reoptimizer)
+        window: quiet period that closes a batch (seconds)
+        max_delay: longest any event waits before its batch runs (seconds)
+        """
+        self._reoptimize = reoptimize
+        self.window = window
+        self.max_delay = max_delay
+        self._resolve_waiting = resolve_waiting
+        self._cond = threading.Condition()
+        self._pending: List[tuple] = []   # (events, future, submitted_at)
+        self._thread = None
+        self.stats = {"events": 0, "batches": 0, "groups": 0}
+
+    def submit(self, events: Iterable[ReoptEvent]) -> Future:
+        """Queue events; the Future resolves to {student_id: section_id} for their students."""
+        events = list(events)
+        for ev in events:
+            if ev.kind not in EVENT_KINDS:
+                raise ValueError(f"Unknown event kind '{ev.kind}' (expected one of {EVENT_KINDS})")
+        fut = Future()
+        with self._cond:
+            self._pending.append((events, fut, time.monotonic()))
+            self.stats["events"] += len(events)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._worker, name="reopt-queue", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return fut
+
+    def _take_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            first_at = self._pending[0][2]
+            seen = len(self._pending)
+            # debounce: keep collecting while events still arrive, up to max_delay
+            while True:
+                remaining = first_at + self.max_delay - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(timeout=min(self.window, remaining))
+                if len(self._pending) == seen:
+                    break
+                seen = len(self._pending)
+            batch, self._pending = self._pending, []
+            return batch
+
+    def _worker(self):
+        while True:
+            batch = self._take_batch()
+            try:
+                results = self._run_batch([ev for events, _fut, _t in batch for ev in events])
+            except Exception as e:
+                for _events, fut, _t in batch:
+                    fut.set_exception(e)
+                continue
+            for events, fut, _t in batch:
+                asked = {ev.student_id for ev in events if ev.student_id}
+                fut.set_result({sid: sec for sid, sec in results.items() if not asked or sid in asked})
+
+    def _run_batch(self, events: List[ReoptEvent]) -> Dict[str, int]:
+        reoptimize = self._reoptimize
+        if reoptimize is None:
+            from main_scheduler import run_dynamic_reoptimizer as reoptimize
+        from data_models import DEFAULT_TERM
+
+        by_term = {}
+        for ev in events:
+            by_term.setdefault(ev.term or DEFAULT_TERM, []).append(ev)
+        groups = [
+            (term, student_ids, course_ids, unseat_ids)
+            for term, term_events in by_term.items()
+            for student_ids, course_ids, unseat_ids in group_events(
+                term_events, lambda courses, term=term: self._resolve_waiting(courses, term))
+        ]
+        self.stats["batches"] += 1
+        self.stats["groups"] += len(groups)
+        print(f"🔁 Reopt batch: {len(events)} event(s) → {len(groups)} course group(s) in {len(by_term)} term(s)")
+        results = {}
+        for term, student_ids, course_ids, unseat_ids in groups:
+            results.update(reoptimize(student_ids, course_ids=course_ids or None, term=term,
+                                      unseat_ids=unseat_ids))
+        return results
+
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+def get_queue() -> ReoptQueue:
+    """Process-wide queue used by the web app."""
+    global _queue
+    with _queue_lock:
+        if _queue is None:
+            _queue = ReoptQueue()
+        return _queue
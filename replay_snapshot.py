@@ -0,0 +1,86 @@
+# replay_snapshot.py
+"""
+Replay a saved problem snapshot through the solvers without the database.
+
+How to run:
+    python replay_snapshot.py --snapshot run.npz
+    python replay_snapshot.py --snapshot run.npz --seed 7 --generations 100 --profile
+    python replay_snapshot.py --snapshot run.npz --engine flow
+    python replay_snapshot.py --snapshot run.npz --engine lns --time-limit 5
+    python replay_snapshot.py --snapshot run.npz --selection pareto --weight fairness=1 --weight balance=0.5
+
+Snapshots are produced by generate_schedule(snapshot_path="run.npz").
+"""
+
+import argparse
+import cProfile
+import json
+import pstats
+import time
+from pathlib import Path
+
+from problem_snapshot import ProblemSnapshot
+from main_scheduler import solve_snapshot, ENGINES
+from scoring import SELECTION_MODES
+
+
+def parse_weights(items):
+    """['fairness=1', 'balance=0.5'] → {'fairness': 1.0, 'balance': 0.5}"""
+    weights = {}
+    for item in items or []:
+        name, _, value = item.partition("=")
+        weights[name.strip()] = float(value)
+    return weights
+
+
+def replay(snapshot_path, seed=None, generations=60, pop_size=30, profile=False,
+           weights=None, selection="weighted", engine="ga", time_limit=10.0):
+    problem = ProblemSnapshot.load(snapshot_path)
+    if seed is not None:
+        problem.seed = seed
+    print(f"📦 Loaded snapshot: {len(problem.students)} students, {len(problem.sections)} sections, "
+          f"{len(problem.preferences)} preferences (seed={problem.seed})")
+
+    prof = cProfile.Profile() if profile else None
+    t0 = time.perf_counter()
+    if prof:
+        prof.enable()
+    result = solve_snapshot(problem, generations=generations, pop_size=pop_size,
+                            weights=weights, selection=selection, engine=engine, time_limit=time_limit,
+                            deterministic=True)
+    if prof:
+        prof.disable()
+    elapsed = time.perf_counter() - t0
+
+    assigned = sum(1 for v in result.values() if v)
+    print(f"✅ Replay finished in {elapsed:.2f}s — assigned {assigned}/{len(result)}")
+    if prof:
+        pstats.Stats(prof).sort_stats("cumulative").print_stats(25)
+    return result
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--snapshot", required=True, help="path to a .npz problem snapshot")
+    ap.add_argument("--seed", type=int, default=None, help="override the recorded seed")
+    ap.add_argument("--generations", type=int, default=60)
+    ap.add_argument("--pop-size", type=int, default=30)
+    ap.add_argument("--engine", choices=ENGINES, default="ga")
+    ap.add_argument("--time-limit", type=float, default=10.0, help="LNS wall-clock budget (seconds)")
+    ap.add_argument("--selection", choices=SELECTION_MODES, default="weighted")
+    ap.add_argument("--weight", action="append", metavar="OBJECTIVE=W",
+                    help="objective weight, repeatable (see scoring.OBJECTIVES)")
+    ap.add_argument("--profile", action="store_true", help="print a cProfile summary of the solve")
+    ap.add_argument("--out", default=None, help="write the resulting assignments as JSON")
+    args = ap.parse_args()
+
+    if not Path(args.snapshot).exists():
+        raise SystemExit(f"Snapshot not found: {args.snapshot}")
+
+    result = replay(args.snapshot, seed=args.seed, generations=args.generations,
+                    pop_size=args.pop_size, profile=args.profile,
+                    weights=parse_weights(args.weight), selection=args.selection, engine=args.engine,
+                    time_limit=args.time_limit)
+    if args.out:
+        Path(args.out).write_text(json.dumps(result, indent=2))
+        print(f"💾 Assignments written to {args.out}")
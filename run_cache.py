@@ -0,0 +1,90 @@
+# run_cache.py
+"""
+Input-fingerprint cache for generate_schedule.
+
+The fingerprint is a SHA-256 over everything a run depends on: the students'
+eligibility fields, courses, sections, faculty limits, preferences and their
+ranked choices, the demand-model artifact version and the solver config
+(engine, weights, selection, budgets, seed, term). Only the term's own
+sections, preferences and assignments are read. Live counters that change
+as seats are taken (sections.enrolled / version) are left out.
+
+A run is only served from cache when it is still the newest write to the
+assignments of its term — once a reservation, reopt or another run has written
+assignments, the stored result no longer describes the live schedule.
+An unseeded request matches any earlier unseeded run with the same inputs.
+"""
+
+import hashlib
+import json
+from typing import Dict, Optional
+
+from sqlalchemy import func
+
+from data_models import (
+    DEFAULT_TERM, Assignment, Course, Faculty, Preference, PreferenceChoice, ScheduleRun, Section, Student,
+)
+from model_registry import DEFAULT_MODEL_PATH, model_version
+
+FINGERPRINT_VERSION = 1
+
+
+def input_fingerprint(sess, config: dict, model_path: str = DEFAULT_MODEL_PATH, term: str = DEFAULT_TERM) -> str:
+    """
+    config: solver settings that change the result (engine, weights, seed, ...)
+    term: term whose sections and preferences are hashed
+    Returns a hex digest; equal digests mean generate_schedule would see the same inputs.
+    """
+    h = hashlib.sha256()
+
+    def feed(tag, rows):
+        h.update(tag.encode())
+        for row in rows:
+            h.update(repr(tuple(row)).encode())
+            h.update(b"\n")
+
+    feed("v", [(FINGERPRINT_VERSION, model_version(model_path))])
+    feed("config", [(json.dumps(config, sort_keys=True, default=str),)])
+    feed("students", sess.query(Student.student_id, Student.cgpa, Student.payment_cleared,
+                                Student.evaluation_done, Student.level, Student.department)
+         .order_by(Student.id))
+    feed("courses", sess.query(Course.id, Course.level, Course.credits).order_by(Course.id))
+    feed("sections", sess.query(Section.id, Section.course_id, Section.code, Section.day, Section.start_time,
+                                Section.end_time, Section.room, Section.capacity, Section.faculty_id)
+         .filter(Section.term == term).order_by(Section.id))
+    feed("faculty", sess.query(Faculty.id, Faculty.max_load, Faculty.available).order_by(Faculty.id))
+    feed("preferences", sess.query(Preference.id, Preference.student_id, Preference.course_id,
+                                   Preference.preferred_sections, Preference.time_pref)
+         .filter(Preference.term == term).order_by(Preference.id))
+    feed("choices", sess.query(PreferenceChoice.preference_id, PreferenceChoice.section_id, PreferenceChoice.rank)
+         .join(Preference, Preference.id == PreferenceChoice.preference_id).filter(Preference.term == term)
+         .order_by(PreferenceChoice.preference_id, PreferenceChoice.rank))
+    return h.hexdigest()
+
+
+def find_cached_run(sess, fingerprint: str, term: str = DEFAULT_TERM) -> Optional[ScheduleRun]:
+    """Latest run with this fingerprint, if nothing has written assignments of the term since."""
+    run = (
+        sess.query(ScheduleRun)
+        .filter(ScheduleRun.term == term, ScheduleRun.fingerprint == fingerprint)
+        .order_by(ScheduleRun.id.desc())
+        .first()
+    )
+    if run is None:
+        return None
+    last_write = sess.query(func.max(Assignment.id)).filter(Assignment.term == term).scalar()
+    last_of_run = sess.query(func.max(Assignment.id)).filter(Assignment.run_id == run.id).scalar()
+    if last_of_run is None or last_write != last_of_run:
+        return None
+    return run
+
+
+def run_result(sess, run: ScheduleRun) -> Dict[str, int]:
+    """{student_id: section_id or None} as persisted by the run."""
+    rows = (
+        sess.query(Student.student_id, Assignment.section_id)
+        .join(Assignment, Assignment.student_id == Student.id)
+        .filter(Assignment.run_id == run.id)
+        .order_by(Assignment.id)
+    )
+    return {sid: sec_id for sid, sec_id in rows}
@@ -0,0 +1,190 @@
+# scenarios.py
+"""
+What-if scenario evaluation on problem snapshots.
+
+A scenario is an overlay of changes ("add section C to CSE 1110", "raise
+capacity of room 401", "drop section 17") applied to an in-memory
+ProblemSnapshot. Overlays are copy-on-write: students, preferences, priorities
+and demand are shared with the base snapshot and only the section list is
+rebuilt, reusing every untouched section record.
+
+evaluate_scenarios() runs the alternatives in parallel on one process pool
+that lives as long as the server process. The base snapshot is written once
+per call to a temporary .npz file; each task carries only that path and its
+small overlay, and each worker loads the file at most once per call (cached
+by path). Nothing touches the database.
+"""
+
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List
+
+from problem_snapshot import ProblemSnapshot, SectionRec
+from scoring import ScoringEngine, OBJECTIVES
+
+# fields an added section needs when its course has no section to copy them from
+REQUIRED_SECTION_FIELDS = ("faculty_id", "day", "start_time", "end_time")
+
+_pool = None
+_pool_lock = threading.Lock()
+_worker_problem = (None, None)   # (snapshot path, snapshot) cached in each worker
+
+
+class ScenarioOverlay:
+    def __init__(self, name: str, add_sections: List[dict] = None, capacity: Dict[int, int] = None,
+                 room_capacity: Dict[str, int] = None, remove_sections: List[int] = None):
+        """
+        name: label reported with the metrics
+        add_sections: [{"course_id": "CSE 1110", "code": "C", ...}] — missing fields
+                      (faculty, room, day, times, capacity) are copied from an
+                      existing section of the same course
+        capacity: {section_id: new capacity}
+        room_capacity: {room: capacity applied to every section in that room}
+        remove_sections: section ids to drop
+        """
+        self.name = name
+        self.add_sections = add_sections or []
+        self.capacity = {int(k): int(v) for k, v in (capacity or {}).items()}
+        self.room_capacity = {str(k): int(v) for k, v in (room_capacity or {}).items()}
+        self.remove_sections = set(int(x) for x in (remove_sections or []))
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ScenarioOverlay":
+        return cls(data.get("name", "scenario"), data.get("add_sections"), data.get("capacity"),
+                   data.get("room_capacity"), data.get("remove_sections"))
+
+
+def validate_overlay(problem: ProblemSnapshot, overlay: ScenarioOverlay):
+    """Raise ValueError if the overlay cannot be applied to the problem (e.g. an added section without course_id)."""
+    courses = {sec.course_id for sec in problem.sections}
+    for n, spec in enumerate(overlay.add_sections, start=1):
+        if not isinstance(spec, dict) or not spec.get("course_id"):
+            raise ValueError(f"Scenario '{overlay.name}': added section #{n} needs a course_id")
+        if spec["course_id"] not in courses:
+            missing = [f for f in REQUIRED_SECTION_FIELDS if spec.get(f) is None]
+            if missing:
+                raise ValueError(f"Scenario '{overlay.name}': {spec['course_id']} has no section to copy "
+                                 f"from, so the added section needs {', '.join(missing)}")
+
+
+def apply_overlay(problem: ProblemSnapshot, overlay: ScenarioOverlay) -> ProblemSnapshot:
+    """New snapshot with the overlay applied; the base snapshot is never modified."""
+    validate_overlay(problem, overlay)
+    sections = []
+    template = {}
+    for sec in problem.sections:
+        template.setdefault(sec.course_id, sec)
+        if sec.id in overlay.remove_sections:
+            continue
+        cap = overlay.capacity.get(sec.id, overlay.room_capacity.get(str(sec.room), sec.capacity))
+        sections.append(sec if cap == sec.capacity else sec._replace(capacity=cap))
+
+    # added sections get negative ids so they never collide with DB ids
+    for n, spec in enumerate(overlay.add_sections, start=1):
+        base = template.get(spec["course_id"])
+        fields = base._asdict() if base else dict.fromkeys(SectionRec._fields)
+        fields.update({k: v for k, v in spec.items() if k in fields})
+        fields["id"] = -n
+        fields["capacity"] = int(fields["capacity"] or 40)
+        sections.append(SectionRec(**fields))
+
+    return ProblemSnapshot(problem.students, sections, problem.preferences, problem.priomap,
+                           problem.demand_weight, problem.seed, problem.faculty)
+
+
+def scenario_metrics(problem: ProblemSnapshot, result: Dict[str, int]) -> dict:
+    """Comparable numbers for one solved scenario."""
+    prefs = problem.preference_map()
+    assigned = sum(1 for v in result.values() if v is not None)
+
+    # overflow: students asking for a course beyond the seats it offers
+    requests, seats = {}, {}
+    for sid in result:
+        pref = prefs.get(sid)
+        if pref and pref.course_id:
+            requests[pref.course_id] = requests.get(pref.course_id, 0) + 1
+    for sec in problem.sections:
+        seats[sec.course_id] = seats.get(sec.course_id, 0) + max(sec.capacity or 0, 0)
+    overflow = sum(max(n - seats.get(c, 0), 0) for c, n in requests.items())
+
+    engine = ScoringEngine(problem.students, problem.sections, prefs, problem.priomap, problem.demand_weight)
+    genes = engine.encode(result)
+    objectives = engine.evaluate(genes)[0]
+    # students with at least one ranked choice, and how many got one of them
+    with_pref = int(engine.has_choice.sum())
+    satisfied = int(engine.preference_hits(genes)[engine.has_choice].sum())
+    return {
+        "students": len(result),
+        "assigned": assigned,
+        "unassigned": len(result) - assigned,
+        "preference_satisfaction": round(satisfied / with_pref, 4) if with_pref else None,
+        "overflow": overflow,
+        "objectives": {o: round(float(v), 3) for o, v in zip(OBJECTIVES, objectives)},
+    }
+
+
+def evaluate_scenario(problem: ProblemSnapshot, overlay: ScenarioOverlay, engine: str = "flow",
+                      time_limit: float = 5.0) -> dict:
+    from main_scheduler import solve_snapshot
+
+    t0 = time.perf_counter()
+    variant = apply_overlay(problem, overlay)
+    result = solve_snapshot(variant, engine=engine, time_limit=time_limit)
+    metrics = scenario_metrics(variant, result)
+    metrics.update({"name": overlay.name, "engine": engine, "seconds": round(time.perf_counter() - t0, 3)})
+    return metrics
+
+
+def _evaluate_in_worker(snapshot_path: str, overlay: ScenarioOverlay, engine: str, time_limit: float) -> dict:
+    global _worker_problem
+    if _worker_problem[0] != snapshot_path:
+        _worker_problem = (snapshot_path, ProblemSnapshot.load(snapshot_path))
+    return evaluate_scenario(_worker_problem[1], overlay, engine=engine, time_limit=time_limit)
+
+
+def _get_pool(max_workers: int = None) -> ProcessPoolExecutor:
+    """The shared worker pool, created on first use (max_workers only applies then)."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=max_workers)
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def evaluate_scenarios(problem: ProblemSnapshot, overlays: List[ScenarioOverlay], engine: str = "flow",
+                       time_limit: float = 5.0, max_workers: int = None) -> List[dict]:
+    """
+    Evaluate the baseline plus every overlay on the shared process pool.
+    Returns metrics in input order, baseline first. Raises ValueError for an
+    invalid overlay before any work is started.
+    """
+    overlays = [ScenarioOverlay("baseline")] + list(overlays)
+    for o in overlays:
+        validate_overlay(problem, o)
+    if max_workers == 1:
+        return [evaluate_scenario(problem, o, engine, time_limit) for o in overlays]
+
+    fd, path = tempfile.mkstemp(prefix="scenario_", suffix=".npz")
+    os.close(fd)
+    try:
+        problem.save(path)
+        futures = [_get_pool(max_workers).submit(_evaluate_in_worker, path, o, engine, time_limit)
+                   for o in overlays]
+        return [f.result() for f in futures]
+    except BrokenProcessPool:
+        _reset_pool()   # a worker died; the next call starts a fresh pool
+        raise
+    finally:
+        os.remove(path)
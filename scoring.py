@@ -0,0 +1,246 @@
+# scoring.py
+"""
+Vectorized multi-objective scoring for candidate schedules.
+
+A schedule is encoded as an int array with one gene per student holding the
+index of the assigned section (-1 = unassigned). evaluate() scores a whole
+population matrix (pop_size × n_students) in one numpy pass and returns one
+column per objective:
+
+- preference:  ranked choice bonus (2.0 / 1.5 / 1.0 ..., never below 0.5),
+               -1.0 per 08:xx start for avoid_08
+- priority:    3.0 × priority weight of each assigned student
+- demand:      0.1 × predicted demand of each assigned course
+- fairness:    -(spread of mean satisfaction across CGPA tiers) × n_students
+- balance:     -(std of section fill ratios) × n_students
+- utilization: (seats used within capacity - overflow) / total capacity × n_students
+
+Ranks come from the normalized PreferenceChoice rows; preferences without
+them fall back to the order of codes in the legacy preferred_sections string.
+For first choices the first three objectives reproduce the original GA
+fitness; the default weights keep the others switched off.
+"""
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from eligibility_engine import priority_tier
+
+OBJECTIVES = ("preference", "priority", "demand", "fairness", "balance", "utilization")
+DEFAULT_WEIGHTS = {
+    "preference": 1.0,
+    "priority": 1.0,
+    "demand": 1.0,
+    "fairness": 0.0,
+    "balance": 0.0,
+    "utilization": 0.0,
+}
+SELECTION_MODES = ("weighted", "lexicographic", "pareto")
+
+FIRST_CHOICE_BONUS = 2.0
+RANK_STEP = 0.5
+MIN_CHOICE_BONUS = 0.5
+
+
+def _split_codes(text) -> List[str]:
+    return [x.strip() for x in (text or "").split(",") if x.strip()]
+
+
+def rank_bonus(rank: int) -> float:
+    """Preference bonus for the student's rank-th choice (1 = first)."""
+    return max(FIRST_CHOICE_BONUS - RANK_STEP * (rank - 1), MIN_CHOICE_BONUS)
+
+
+def ranked_choices(pref):
+    """
+    [(section_id, rank)] from a preference's normalized choices — PreferenceChoice
+    rows or snapshot (section_id, rank) tuples. None when it has none.
+    """
+    choices = getattr(pref, "choices", None)
+    if not choices:
+        return None
+    return [c if isinstance(c, tuple) else (c.section_id, c.rank) for c in choices]
+
+
+class ScoringEngine:
+    def __init__(self, students, sections, preferences: Dict[str, object],
+                 priomap: Dict[str, float], demand_weight: Dict[str, float],
+                 weights: Dict[str, float] = None):
+        """
+        students / sections: ORM rows or snapshot records
+        preferences: {student_id: Preference}
+        priomap: {student_id: priority weight}
+        demand_weight: {course_id: predicted demand}
+        weights: {objective: weight}; missing keys fall back to DEFAULT_WEIGHTS
+        """
+        self.student_ids = [s.student_id for s in students]
+        self.section_ids = [sec.id for sec in sections]
+        self.sec_index = {sid: i for i, sid in enumerate(self.section_ids)}
+        n_stu, n_sec = len(self.student_ids), len(self.section_ids)
+        self.n_students, self.n_sections = n_stu, n_sec
+
+        unknown = set(weights or {}) - set(OBJECTIVES)
+        if unknown:
+            raise ValueError(f"Unknown objective(s): {', '.join(sorted(unknown))}")
+        self.weights = {**DEFAULT_WEIGHTS, **(weights or {})}
+        self.weight_vector = np.array([self.weights[o] for o in OBJECTIVES], dtype=np.float64)
+
+        # ---- per-section arrays ----
+        self.capacity = np.array([max(int(sec.capacity or 0), 0) for sec in sections], dtype=np.float64)
+        self.morning = np.array([str(sec.start_time).startswith("08") for sec in sections], dtype=bool)
+        self.demand = 0.1 * np.array([demand_weight.get(sec.course_id, 0.0) for sec in sections],
+                                     dtype=np.float64)
+
+        # ---- per-student arrays ----
+        self.priority = 3.0 * np.array([priomap.get(sid, 0.0) for sid in self.student_ids], dtype=np.float64)
+        tiers = np.array([priority_tier(s) for s in students], dtype=np.int64)
+        self.tier_values, self.tier = np.unique(tiers, return_inverse=True)
+        self.tier_onehot = np.eye(len(self.tier_values))[self.tier] if n_stu else np.zeros((0, 0))
+        self.tier_counts = self.tier_onehot.sum(axis=0)
+        self.avoid_morning = np.zeros(n_stu, dtype=bool)
+        self.has_choice = np.zeros(n_stu, dtype=bool)
+
+        # ---- ranked preference bonus as sorted sparse keys (student * n_sec + section) ----
+        # choices are resolved once here, never inside the evaluation loop
+        secs_by_code: Dict[str, List[int]] = {}
+        for j, sec in enumerate(sections):
+            secs_by_code.setdefault(sec.code, []).append(j)
+        keys, vals = [], []
+        for i, sid in enumerate(self.student_ids):
+            pref = preferences.get(sid)
+            if not pref:
+                continue
+            self.avoid_morning[i] = pref.time_pref == "avoid_08"
+            choices = ranked_choices(pref)
+            if choices is not None:
+                hits = [([self.sec_index[sec_id]], rank) for sec_id, rank in choices
+                        if sec_id in self.sec_index]
+            else:
+                codes = dict.fromkeys(_split_codes(pref.preferred_sections))
+                hits = [(secs_by_code.get(code, ()), rank) for rank, code in enumerate(codes, start=1)]
+            for idxs, rank in hits:
+                for j in idxs:
+                    keys.append(i * n_sec + j)
+                    vals.append(rank_bonus(rank))
+                    self.has_choice[i] = True
+        order = np.argsort(np.array(keys, dtype=np.int64), kind="stable")
+        self.pref_keys = np.array(keys, dtype=np.int64)[order]
+        self.pref_vals = np.array(vals, dtype=np.float64)[order]
+
+    # ------------------------------------------------------
+    # Encoding helpers
+    # ------------------------------------------------------
+    def encode(self, indiv: Dict[str, int]) -> np.ndarray:
+        return np.array([self.sec_index.get(indiv.get(sid), -1) for sid in self.student_ids], dtype=np.int64)
+
+    def decode(self, genes: np.ndarray) -> Dict[str, int]:
+        return {sid: (self.section_ids[g] if g >= 0 else None) for sid, g in zip(self.student_ids, genes)}
+
+    def pair_scores(self, student_idx: np.ndarray, section_idx: np.ndarray) -> np.ndarray:
+        """Weighted per-assignment score (preference + priority + demand) for student/section pairs."""
+        bonus = self._pref_lookup(student_idx * self.n_sections + section_idx)
+        pref = bonus - (self.avoid_morning[student_idx] & self.morning[section_idx])
+        w = self.weights
+        return (w["preference"] * pref + w["priority"] * self.priority[student_idx]
+                + w["demand"] * self.demand[section_idx])
+
+    def preference_hits(self, genes: np.ndarray) -> np.ndarray:
+        """Per student: True when the assigned section is one of their ranked choices."""
+        genes = np.asarray(genes)
+        keys = np.arange(self.n_students) * self.n_sections + np.maximum(genes, 0)
+        return (genes >= 0) & (self._pref_lookup(keys) > 0)
+
+    def _pref_lookup(self, keys: np.ndarray) -> np.ndarray:
+        if not len(self.pref_keys):
+            return np.zeros(keys.shape, dtype=np.float64)
+        pos = np.searchsorted(self.pref_keys, keys)
+        pos = np.minimum(pos, len(self.pref_keys) - 1)
+        hit = self.pref_keys[pos] == keys
+        return np.where(hit, self.pref_vals[pos], 0.0)
+
+    # ------------------------------------------------------
+    # Population evaluation
+    # ------------------------------------------------------
+    def evaluate(self, population: np.ndarray) -> np.ndarray:
+        """population: (P, n_students) section indices → (P, len(OBJECTIVES)) objective values."""
+        pop = np.atleast_2d(population)
+        P, n_stu, n_sec = pop.shape[0], self.n_students, self.n_sections
+        out = np.zeros((P, len(OBJECTIVES)), dtype=np.float64)
+        if n_stu == 0 or n_sec == 0:
+            return out
+
+        assigned = pop >= 0
+        sec = np.where(assigned, pop, 0)
+        stu = np.broadcast_to(np.arange(n_stu), pop.shape)
+
+        bonus = np.where(assigned, self._pref_lookup(stu * n_sec + sec), 0.0)
+        penalty = assigned & self.avoid_morning[None, :] & self.morning[sec]
+        out[:, 0] = bonus.sum(axis=1) - penalty.sum(axis=1)
+        out[:, 1] = (assigned * self.priority[None, :]).sum(axis=1)
+        out[:, 2] = np.where(assigned, self.demand[sec], 0.0).sum(axis=1)
+
+        # per-student satisfaction: 1 = preferred hit, 0.5 = assigned elsewhere, 0 = unassigned
+        satisfaction = np.where(bonus > 0, 1.0, 0.5) * assigned
+        if len(self.tier_values) > 1:
+            tier_mean = (satisfaction @ self.tier_onehot) / self.tier_counts[None, :]
+            out[:, 3] = -(tier_mean.max(axis=1) - tier_mean.min(axis=1)) * n_stu
+
+        # section loads for every individual from a single bincount
+        flat = (np.arange(P)[:, None] * n_sec + sec)[assigned]
+        loads = np.bincount(flat, minlength=P * n_sec).reshape(P, n_sec).astype(np.float64)
+        has_cap = self.capacity > 0
+        if has_cap.any():
+            cap = self.capacity[has_cap]
+            fill = loads[:, has_cap] / cap[None, :]
+            out[:, 4] = -fill.std(axis=1) * n_stu
+            used = np.minimum(loads[:, has_cap], cap[None, :]).sum(axis=1)
+            overflow = np.maximum(loads - self.capacity[None, :], 0.0).sum(axis=1)
+            out[:, 5] = (used - overflow) / cap.sum() * n_stu
+        return out
+
+    def weighted(self, objectives: np.ndarray) -> np.ndarray:
+        return objectives @ self.weight_vector
+
+    # ------------------------------------------------------
+    # Ranking
+    # ------------------------------------------------------
+    def rank(self, objectives: np.ndarray, selection: str = "weighted",
+             lex_order: Sequence[str] = None) -> np.ndarray:
+        """Indices of the individuals, best first."""
+        score = self.weighted(objectives)
+        if selection == "weighted":
+            return np.argsort(-score, kind="stable")
+        if selection == "lexicographic":
+            order = list(lex_order or self._active_by_weight())
+            cols = [objectives[:, OBJECTIVES.index(o)] for o in order]
+            # np.lexsort sorts by the last key first
+            return np.lexsort([-score] + [-c for c in reversed(cols)])
+        if selection == "pareto":
+            active = [OBJECTIVES.index(o) for o in self._active_by_weight()]
+            fronts = pareto_fronts(objectives[:, active])
+            return np.lexsort([-score, fronts])
+        raise ValueError(f"Unknown selection '{selection}' (expected one of {SELECTION_MODES})")
+
+    def _active_by_weight(self) -> List[str]:
+        active = [o for o in OBJECTIVES if self.weights[o] > 0]
+        return sorted(active, key=lambda o: -self.weights[o]) or list(OBJECTIVES)
+
+
+def pareto_fronts(objectives: np.ndarray) -> np.ndarray:
+    """Non-dominated sorting (maximization): front number per row, 0 = Pareto-optimal."""
+    n = objectives.shape[0]
+    ge = (objectives[:, None, :] >= objectives[None, :, :]).all(axis=2)
+    gt = (objectives[:, None, :] > objectives[None, :, :]).any(axis=2)
+    dominates = ge & gt                     # dominates[i, j]: i dominates j
+    dom_count = dominates.sum(axis=0)       # how many rows dominate j
+    fronts = np.full(n, -1, dtype=np.int64)
+    current = np.flatnonzero(dom_count == 0)
+    level = 0
+    while current.size:
+        fronts[current] = level
+        dom_count = dom_count - dominates[current].sum(axis=0)
+        dom_count[fronts >= 0] = -1
+        current = np.flatnonzero(dom_count == 0)
+        level += 1
+    return fronts
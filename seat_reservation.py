@@ -0,0 +1,130 @@
+# seat_reservation.py
+"""
+Fast seat reservation without the optimizer.
+
+A student claiming an open seat touches one Section row and adds one
+Assignment, in one short transaction. Concurrency safety comes from the
+per-section `enrolled` counter plus `version` column: the ORM's UPDATE is
+"... WHERE id = :id AND version = :seen", so if another writer got there
+first the update matches no row, SQLAlchemy raises StaleDataError and we
+re-read and retry. On PostgreSQL the section row is locked with
+SELECT ... FOR UPDATE instead, so writers queue rather than retry.
+
+A student holds at most one seat per term; the term comes from the section.
+The "already assigned?" check is guarded the same way: every claim or release
+bumps students.seat_version with "... WHERE id = :id AND seat_version = :seen"
+in the same transaction, so of two concurrent claims for one student only one
+commits and the other re-checks the student's seat.
+"""
+
+from sqlalchemy import update
+from sqlalchemy.orm.exc import StaleDataError
+
+from data_models import DEFAULT_TERM, Assignment, Section, Student
+from eligibility_engine import is_eligible
+
+MAX_RETRIES = 5
+
+
+def _current_assignment(sess, student_pk, term):
+    return (
+        sess.query(Assignment)
+        .filter(Assignment.term == term, Assignment.student_id == student_pk)
+        .order_by(Assignment.id.desc())
+        .first()
+    )
+
+
+def _load_section(sess, section_id):
+    q = sess.query(Section).filter(Section.id == section_id).populate_existing()
+    if sess.get_bind().dialect.name == "postgresql":
+        q = q.with_for_update()
+    return q.first()
+
+
+def _bump_seat_version(sess, student_pk, seen):
+    """Compare-and-swap on the student's seat_version; raises StaleDataError if another writer bumped it."""
+    res = sess.execute(
+        update(Student)
+        .where(Student.id == student_pk, Student.seat_version == seen)
+        .values(seat_version=seen + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if res.rowcount != 1:
+        raise StaleDataError(f"Student {student_pk} seat changed concurrently")
+
+
+def _seat_version(sess, student_pk):
+    return sess.query(Student.seat_version).filter(Student.id == student_pk).scalar()
+
+
+def reserve_seat(sess, student_id: str, section_id: int, max_retries: int = MAX_RETRIES) -> dict:
+    """
+    Claim one seat in a section for a student.
+    Returns {"status": "reserved" | "full" | "already_assigned" | "ineligible" |
+             "not_found" | "conflict", ...}
+    """
+    stu = sess.query(Student).filter_by(student_id=student_id).first()
+    if not stu:
+        return {"status": "not_found", "message": f"Unknown student {student_id}"}
+    if not is_eligible(stu):
+        return {"status": "ineligible", "message": "Payment or evaluation not cleared"}
+
+    term = sess.query(Section.term).filter(Section.id == section_id).scalar()
+    if term is None:
+        return {"status": "not_found", "message": f"Unknown section {section_id}"}
+    for _attempt in range(max_retries):
+        seen = _seat_version(sess, stu.id)
+        current = _current_assignment(sess, stu.id, term)
+        if current and current.status == "assigned" and current.section_id:
+            sess.rollback()
+            return {"status": "already_assigned", "section_id": current.section_id}
+        sec = _load_section(sess, section_id)
+        if not sec:
+            sess.rollback()
+            return {"status": "not_found", "message": f"Unknown section {section_id}"}
+        if sec.enrolled >= (sec.capacity or 0):
+            sess.rollback()
+            return {"status": "full", "section_id": section_id, "capacity": sec.capacity}
+
+        sec.enrolled += 1
+        sess.add(Assignment(term=term, student_id=stu.id, section_id=sec.id, status="assigned"))
+        try:
+            _bump_seat_version(sess, stu.id, seen)
+            sess.commit()   # UPDATE sections ... WHERE id = ? AND version = ?
+        except StaleDataError:
+            sess.rollback()  # another writer took the seat or touched the student — re-read and retry
+            continue
+        return {"status": "reserved", "section_id": sec.id, "enrolled": sec.enrolled,
+                "capacity": sec.capacity}
+
+    return {"status": "conflict", "message": "Too much contention on this section, try again"}
+
+
+def release_seat(sess, student_id: str, max_retries: int = MAX_RETRIES, term: str = DEFAULT_TERM) -> dict:
+    """Give up the student's current seat in a term. Returns {"status": "released" | "not_assigned" | ...}."""
+    stu = sess.query(Student).filter_by(student_id=student_id).first()
+    if not stu:
+        return {"status": "not_found", "message": f"Unknown student {student_id}"}
+
+    for _attempt in range(max_retries):
+        seen = _seat_version(sess, stu.id)
+        current = _current_assignment(sess, stu.id, term)
+        if not current or current.status != "assigned" or not current.section_id:
+            sess.rollback()
+            return {"status": "not_assigned"}
+        sec = _load_section(sess, current.section_id)
+        if not sec:
+            sess.rollback()
+            return {"status": "not_found", "message": f"Unknown section {current.section_id}"}
+        sec.enrolled = max(sec.enrolled - 1, 0)
+        sess.add(Assignment(term=term, student_id=stu.id, section_id=None, status="not_assigned"))
+        try:
+            _bump_seat_version(sess, stu.id, seen)
+            sess.commit()
+        except StaleDataError:
+            sess.rollback()
+            continue
+        return {"status": "released", "section_id": sec.id, "enrolled": sec.enrolled}
+
+    return {"status": "conflict", "message": "Too much contention on this section, try again"}
@@ -1,8 +1,9 @@
 # seed_from_combined_csv.py
 import pandas as pd
+from pathlib import Path
 from sqlalchemy.orm import Session
-from database import init_db, SessionLocal
-from data_models import Course, Section, Faculty
+from database import init_db, SessionLocal, sync_preference_choices
+from data_models import DEFAULT_TERM, Course, Section, Faculty, Preference
 
 CSV_PATH = "class_schedule_combined.csv"
 
@@ -53,8 +54,15 @@ def load_and_clean_csv(path):
 # ==================================================
 # Seeding logic
 # ==================================================
-def seed_from_combined(sess: Session):
-    df = load_and_clean_csv(CSV_PATH)
+def _term_sections(sess, term):
+    return {(s.course_id, s.code): s for s in sess.query(Section).filter(Section.term == term)}
+
+def seed_from_combined(sess: Session, csv_path=CSV_PATH, term=DEFAULT_TERM):
+    df = load_and_clean_csv(csv_path)
+
+    # lookups built once instead of one query per CSV row
+    faculty_by_name = {f.name: f for f in sess.query(Faculty).all()}
+    section_by_key = _term_sections(sess, term)
 
     inserted_courses = 0
     inserted_faculty = 0
@@ -84,7 +92,7 @@ def seed_from_combined(sess: Session):
                 inserted_courses += 1
 
             # ----- Add or get faculty -----
-            faculty = sess.query(Faculty).filter_by(name=faculty_name).first()
+            faculty = faculty_by_name.get(faculty_name)
             if not faculty:
                 faculty = Faculty(
                     code=faculty_initial or faculty_name[:3].upper(),
@@ -94,14 +102,11 @@ def seed_from_combined(sess: Session):
                 )
                 sess.add(faculty)
                 sess.flush()
+                faculty_by_name[faculty_name] = faculty
                 inserted_faculty += 1
 
             # ----- Handle section -----
-            existing_section = (
-                sess.query(Section)
-                .filter_by(course_id=course_id, code=section_code)
-                .first()
-            )
+            existing_section = section_by_key.get((course_id, section_code))
 
             day1, time1, room1 = row.get("Day1"), row.get("Time1"), row.get("Room1")
             day2, time2, room2 = row.get("Day2"), row.get("Time2"), row.get("Room2")
@@ -119,6 +124,7 @@ def seed_from_combined(sess: Session):
                 updated_sections += 1
             else:
                 sec = Section(
+                    term=term,
                     course_id=course_id,
                     code=section_code,
                     day=str(day1).strip() if pd.notna(day1) else None,
@@ -129,11 +135,15 @@ def seed_from_combined(sess: Session):
                     faculty_id=faculty.id,
                 )
                 sess.add(sec)
+                section_by_key[(course_id, section_code)] = sec
                 inserted_sections += 1
 
         except Exception as e:
             print(f"⚠️ Skipped a row ({course_id if 'course_id' in locals() else '?'}) — {e}")
             sess.rollback()
+            # rollback drops pending rows, so the lookups must be rebuilt
+            faculty_by_name = {f.name: f for f in sess.query(Faculty).all()}
+            section_by_key = _term_sections(sess, term)
             continue
 
     sess.commit()
@@ -144,6 +154,39 @@ def seed_from_combined(sess: Session):
     print("✅ Seeding complete!")
 
 
+# ==================================================
+# Upload entry point (used by app.py /admin/upload-csv)
+# ==================================================
+def seed_all(students_csv=None, courses_csv=None, sections_csv=None, prefs_csv=None, term=DEFAULT_TERM):
+    """
+    sections_csv: combined class-schedule export (courses + sections + faculty)
+    students_csv / courses_csv / prefs_csv: generic CSVs, columns detected by ingest_schedule_csv
+    term: term the sections and preferences belong to
+    Returns the term's timetable violations (room/faculty clashes, faculty overload) after seeding.
+    """
+    from ingest_schedule_csv import seed_from_csv
+    from timetable_index import validate_timetable
+
+    init_db()
+    for path in (courses_csv, students_csv, prefs_csv):
+        if path:
+            seed_from_csv(Path(path), term=term)
+
+    sess = SessionLocal()
+    try:
+        if sections_csv:
+            seed_from_combined(sess, sections_csv, term=term)
+            # preferences may have been loaded before their sections existed — link their ranked choices now
+            sync_preference_choices(sess, sess.query(Preference).filter(Preference.term == term))
+            sess.commit()
+        violations = validate_timetable(sess.query(Section).filter(Section.term == term).all(),
+                                        sess.query(Faculty).all())
+    finally:
+        sess.close()
+    print(f"🔎 Timetable check: {len(violations)} violation(s)")
+    return violations
+
+
 # ==================================================
 # Entry Point
 # ==================================================
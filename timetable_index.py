@@ -0,0 +1,133 @@
+# timetable_index.py
+"""
+Indexed timetable checks.
+
+Sections are indexed once per term by room and by faculty into
+{key: {day: [(start, end, section_id), ...] sorted by start}}. Clashes are
+then found with a sweep over each (key, day) list instead of comparing every
+pair of sections, so validating a whole timetable costs O(n log n + clashes).
+"""
+
+import re
+from collections import defaultdict
+from typing import Dict, List, Tuple
+
+DAY_NAMES = ("Sat", "Sun", "Mon", "Tue", "Wed", "Thu", "Fri")
+UNASSIGNED_ROOMS = {"", "TBA", "NAN", "NONE", "N/A"}
+
+_TIME_RE = re.compile(r"(\d{1,2}):(\d{2})(?::?\s*([AaPp][Mm]))?")
+
+
+def parse_minutes(value):
+    """'08:30:AM' / '01:50:PM' / '13:50' / '9:00' → minutes after midnight (None if unparseable)."""
+    if value is None:
+        return None
+    m = _TIME_RE.search(str(value))
+    if not m:
+        return None
+    hh, mm, ampm = int(m.group(1)), int(m.group(2)), (m.group(3) or "").upper()
+    if ampm == "PM" and hh != 12:
+        hh += 12
+    elif ampm == "AM" and hh == 12:
+        hh = 0
+    return hh * 60 + mm
+
+
+def format_minutes(minutes: int) -> str:
+    """Inverse of parse_minutes in the CSV's own style: 510 → '08:30:AM', 830 → '01:50:PM'."""
+    hh, mm = divmod(int(minutes), 60)
+    return f"{(hh - 1) % 12 + 1:02d}:{mm:02d}:{'AM' if hh < 12 else 'PM'}"
+
+
+def parse_days(value) -> List[str]:
+    """'Sat, Tue' → ['Sat', 'Tue']; stray punctuation from the CSV export is dropped."""
+    days = []
+    for part in str(value or "").split(","):
+        name = re.sub(r"[^A-Za-z]", "", part)[:3].title()
+        if name in DAY_NAMES and name not in days:
+            days.append(name)
+    return days
+
+
+def section_slots(sec) -> List[Tuple[str, int, int]]:
+    """[(day, start_min, end_min)] for every meeting of a section; empty if times are unknown."""
+    start, end = parse_minutes(sec.start_time), parse_minutes(sec.end_time)
+    if start is None or end is None or end <= start:
+        return []
+    return [(d, start, end) for d in parse_days(sec.day)]
+
+
+def overlaps(s1, s2) -> bool:
+    slots2 = section_slots(s2)
+    return any(d1 == d2 and a1 < b2 and a2 < b1
+               for d1, a1, b1 in section_slots(s1) for d2, a2, b2 in slots2)
+
+
+def room_key(sec):
+    room = str(sec.room or "").strip()
+    return None if room.upper() in UNASSIGNED_ROOMS else room
+
+
+def faculty_key(sec):
+    return sec.faculty_id
+
+
+def build_slot_index(sections, key_fn) -> Dict[object, Dict[str, list]]:
+    """{key: {day: [(start, end, section_id), ...]}} with each list sorted by start time."""
+    index = defaultdict(lambda: defaultdict(list))
+    for sec in sections:
+        key = key_fn(sec)
+        if key is None:
+            continue
+        for day, start, end in section_slots(sec):
+            index[key][day].append((start, end, sec.id))
+    for by_day in index.values():
+        for slots in by_day.values():
+            slots.sort()
+    return index
+
+
+def find_clashes(index) -> List[Tuple[int, int, object, str]]:
+    """Sweep every (key, day) list → [(section_a, section_b, key, day)] for overlapping pairs."""
+    clashes = []
+    seen = set()
+    for key, by_day in index.items():
+        for day, slots in by_day.items():
+            active = []   # (end, section_id) of meetings still running
+            for start, end, sid in slots:
+                active = [(e, a) for e, a in active if e > start]
+                for _, other in active:
+                    pair = (min(other, sid), max(other, sid))
+                    if other != sid and pair not in seen:
+                        seen.add(pair)
+                        clashes.append((pair[0], pair[1], key, day))
+                active.append((end, sid))
+    return clashes
+
+
+def validate_timetable(sections, faculty) -> List[dict]:
+    """
+    sections: Section rows (or snapshot records)
+    faculty: Faculty rows (or records with id, max_load, available)
+    Returns a list of violations; empty means the timetable is clean.
+    """
+    violations = []
+    for a, b, room, day in find_clashes(build_slot_index(sections, room_key)):
+        violations.append({"type": "room_clash", "room": room, "day": day, "sections": [a, b]})
+    for a, b, fid, day in find_clashes(build_slot_index(sections, faculty_key)):
+        violations.append({"type": "faculty_clash", "faculty_id": fid, "day": day, "sections": [a, b]})
+
+    load = defaultdict(list)
+    for sec in sections:
+        if sec.faculty_id is not None:
+            load[sec.faculty_id].append(sec.id)
+    for f in faculty:
+        secs = load.get(f.id, [])
+        if not secs:
+            continue
+        if not f.available:
+            violations.append({"type": "faculty_unavailable", "faculty_id": f.id, "sections": secs})
+        elif f.max_load is not None and len(secs) > f.max_load:
+            violations.append({"type": "faculty_overload", "faculty_id": f.id,
+                               "max_load": f.max_load, "sections": secs})
+    return violations
@@ -0,0 +1,311 @@
+# timetable_solver.py
+"""
+Section timetabling with CP-SAT interval variables.
+
+Decides (day pattern, start slot, room) for every section of a term:
+- each meeting of a section is an optional fixed-size interval on its day;
+  AddNoOverlap per (room, day) and per (faculty, day) replaces pairwise
+  overlap checks, so the model grows linearly with the number of sections
+- a section may only run if its faculty is available, and each faculty runs
+  at most max_load sections
+- lecture sections keep lecture rooms, lab sections keep lab rooms, and the
+  number of meetings per week (day-pattern length) is preserved
+- the objective serves predicted demand first (seats of a course up to its
+  forecast), then runs as many sections as possible, then keeps current
+  slots/rooms where that costs nothing
+
+Slots, day patterns and rooms default to those already used by the term, so
+the engine can re-timetable a term or place newly added sections
+(fix_existing=True keeps every clash-free placed section where it is).
+
+How to run:
+    python timetable_solver.py --term Spring2025 --time-limit 20
+    python timetable_solver.py --term Fall2025 --fix-existing --apply
+"""
+
+import argparse
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from ortools.sat.python import cp_model
+
+from data_models import DEFAULT_TERM
+from problem_snapshot import SectionRec
+from timetable_index import (
+    build_slot_index, faculty_key, find_clashes, format_minutes, room_key,
+    section_slots, validate_timetable,
+)
+
+DEFAULT_DAY_PATTERNS = (("Sat", "Tue"), ("Sun", "Wed"), ("Mon", "Thu"),
+                        ("Sat",), ("Sun",), ("Mon",), ("Tue",), ("Wed",), ("Thu",))
+DEFAULT_SLOT_STARTS = (510, 590, 670, 750, 830, 910)   # 08:30 … 03:10 PM
+DEFAULT_DURATION = 80
+DEFAULT_DAY_END = 990                                   # 04:30 PM
+
+# objective weights: demand served ≫ sections run ≫ keeping the current placement
+W_SERVED = 10   # per seat of forecast demand covered
+W_OPEN = 20     # per section that runs
+W_KEEP = 1      # per unchanged start / day pattern / room
+
+
+def room_kind(room) -> str:
+    return "lab" if "lab" in str(room or "").lower() else "class"
+
+
+def timetable_grid(sections) -> Tuple[List[tuple], List[int], int]:
+    """(day patterns, slot starts, day end) used by the sections, falling back to the defaults."""
+    patterns, starts, day_end = set(), set(), 0
+    for sec in sections:
+        slots = section_slots(sec)
+        if slots:
+            patterns.add(tuple(d for d, _s, _e in slots))
+            starts.add(slots[0][1])
+            day_end = max(day_end, slots[0][2])
+    return (sorted(patterns or DEFAULT_DAY_PATTERNS, key=lambda p: (-len(p), p)),
+            sorted(starts or DEFAULT_SLOT_STARTS), day_end or DEFAULT_DAY_END)
+
+
+def room_catalog(sections) -> Dict[str, int]:
+    """{room: capacity} for rooms in use; capacity = largest section seen there."""
+    rooms = {}
+    for sec in sections:
+        room = room_key(sec)
+        if room is not None:
+            rooms[room] = max(rooms.get(room, 0), int(sec.capacity or 0))
+    return rooms
+
+
+def _current(sec):
+    """(pattern, start, duration, room) of a section as it stands; parts are None when unknown."""
+    slots = section_slots(sec)
+    if not slots:
+        return None, None, None, room_key(sec)
+    return tuple(d for d, _s, _e in slots), slots[0][1], slots[0][2] - slots[0][1], room_key(sec)
+
+
+def _fixable(sections) -> set:
+    """Placed sections that clash with no other placed section (by room or faculty)."""
+    placed = [sec for sec in sections if section_slots(sec) and room_key(sec) is not None]
+    clashing = set()
+    for key_fn in (room_key, faculty_key):
+        for a, b, _key, _day in find_clashes(build_slot_index(placed, key_fn)):
+            clashing.update((a, b))
+    return {sec.id for sec in placed} - clashing
+
+
+def solve_timetable(sections, faculty=None, demand_weight: Optional[Dict[str, float]] = None,
+                    rooms: Optional[Dict[str, int]] = None, day_patterns=None, slot_starts=None,
+                    day_end: Optional[int] = None, fix_existing: bool = False, max_rooms: int = 8,
+                    time_limit: float = 10.0, num_workers: int = 8):
+    """
+    sections: Section rows or SectionRec; faculty_id is kept, day/time/room are decided here
+    faculty: Faculty rows or records (id, max_load, available)
+    demand_weight: {course_id: predicted enrollment}; courses without a forecast want every seat
+    rooms: {room: capacity} (default: rooms in use, see room_catalog)
+    fix_existing: keep the current placement of every placed, clash-free section
+    max_rooms: candidate rooms per section (best capacity fit of the same kind)
+    Returns ({section_id: {"day", "start_time", "end_time", "room"} or None if it cannot run}, stats)
+    """
+    sections = list(sections)
+    grid_patterns, grid_starts, grid_end = timetable_grid(sections)
+    day_patterns = [tuple(p) for p in (day_patterns or grid_patterns)]
+    slot_starts = sorted(slot_starts or grid_starts)
+    day_end = day_end or grid_end
+    rooms = rooms or room_catalog(sections)
+    demand_weight = demand_weight or {}
+    fac_by_id = {f.id: f for f in (faculty or [])}
+    fixed = _fixable(sections) if fix_existing else set()
+
+    durations = Counter(_current(sec)[2] for sec in sections if _current(sec)[2])
+    default_duration = durations.most_common(1)[0][0] if durations else DEFAULT_DURATION
+
+    model = cp_model.CpModel()
+    by_room_day, by_fac_day = defaultdict(list), defaultdict(list)
+    opens_by_faculty = defaultdict(list)
+    seats_by_course = defaultdict(list)
+    keep_terms, open_terms = [], []
+    vars_by_sec = {}
+
+    for sec in sections:
+        fac = fac_by_id.get(sec.faculty_id)
+        if sec.faculty_id is None or (fac is not None and not fac.available):
+            continue   # cannot run; reported as None
+        cur_pat, cur_start, cur_dur, cur_room = _current(sec)
+        dur = cur_dur or default_duration
+        kind = room_kind(cur_room) if cur_room else None
+        cap = int(sec.capacity or 0)
+
+        if sec.id in fixed and cur_room in rooms:
+            pats, starts, cand_rooms = [cur_pat], [cur_start], [cur_room]
+        else:
+            pats = [p for p in day_patterns if cur_pat is None or len(p) == len(cur_pat)] or day_patterns
+            starts = [t for t in slot_starts if t + dur <= day_end]
+            cand_rooms = sorted(
+                (r for r in rooms if kind is None or room_kind(r) == kind),
+                key=lambda r: (rooms[r] < cap, abs(rooms[r] - cap), r != cur_room),
+            )[:max_rooms]
+            if cur_room in rooms and cur_room not in cand_rooms and (kind is None or room_kind(cur_room) == kind):
+                cand_rooms.append(cur_room)
+        if not starts or not cand_rooms:
+            continue
+
+        is_open = model.NewBoolVar(f"open_{sec.id}")
+        start = model.NewIntVarFromDomain(cp_model.Domain.FromValues(starts), f"start_{sec.id}")
+        pat = {p: model.NewBoolVar(f"pat_{sec.id}_{'-'.join(p)}") for p in pats}
+        room = {r: model.NewBoolVar(f"room_{sec.id}_{n}") for n, r in enumerate(cand_rooms)}
+        model.Add(sum(pat.values()) == is_open)
+        model.Add(sum(room.values()) == is_open)
+
+        for day in sorted({d for p in pats for d in p}):
+            meets = model.NewBoolVar(f"meets_{sec.id}_{day}")
+            model.Add(meets == sum(v for p, v in pat.items() if day in p))
+            by_fac_day[sec.faculty_id, day].append(
+                model.NewOptionalFixedSizeIntervalVar(start, dur, meets, f"fac_{sec.id}_{day}"))
+            for r, in_room in room.items():
+                here = model.NewBoolVar(f"here_{sec.id}_{day}_{r}")
+                model.Add(here <= in_room)
+                model.Add(here <= meets)
+                model.Add(here >= in_room + meets - 1)
+                by_room_day[r, day].append(
+                    model.NewOptionalFixedSizeIntervalVar(start, dur, here, f"room_{sec.id}_{day}_{r}"))
+
+        opens_by_faculty[sec.faculty_id].append(is_open)
+        open_terms.append(is_open)
+        seats_by_course[sec.course_id] += [(min(cap, rooms[r]), v) for r, v in room.items()]
+
+        # keep the current placement when it is free, and start the search from it
+        if cur_start in starts:
+            same_start = model.NewBoolVar(f"keep_start_{sec.id}")
+            model.Add(start == cur_start).OnlyEnforceIf(same_start)
+            keep_terms.append(same_start)
+            model.AddHint(start, cur_start)
+        if cur_pat in pat:
+            keep_terms.append(pat[cur_pat])
+            model.AddHint(pat[cur_pat], 1)
+        if cur_room in room:
+            keep_terms.append(room[cur_room])
+            model.AddHint(room[cur_room], 1)
+        vars_by_sec[sec.id] = (is_open, start, pat, room, dur, (cur_pat, cur_start, cur_room))
+
+    for intervals in list(by_room_day.values()) + list(by_fac_day.values()):
+        if len(intervals) > 1:
+            model.AddNoOverlap(intervals)
+
+    for fid, opens in opens_by_faculty.items():
+        fac = fac_by_id.get(fid)
+        if fac is not None and fac.max_load is not None and len(opens) > fac.max_load:
+            model.Add(sum(opens) <= fac.max_load)
+
+    served_terms, demand_total = [], 0
+    for course_id, seats in seats_by_course.items():
+        offered = sum(s * v for s, v in seats)
+        forecast = demand_weight.get(course_id)
+        if forecast is None:
+            served_terms.append(offered)
+            continue
+        want = max(int(round(forecast)), 0)
+        demand_total += want
+        served = model.NewIntVar(0, want, f"served_{course_id}")
+        model.Add(served <= offered)
+        served_terms.append(served)
+
+    model.Maximize(W_SERVED * sum(served_terms) + W_OPEN * sum(open_terms) + W_KEEP * sum(keep_terms))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = num_workers
+    status = solver.Solve(model)
+
+    placements = {sec.id: None for sec in sections}
+    kept = 0
+    if status in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        for sid, (is_open, start, pat, room, dur, current) in vars_by_sec.items():
+            if not solver.Value(is_open):
+                continue
+            t = solver.Value(start)
+            p = next(p for p, v in pat.items() if solver.Value(v))
+            r = next(r for r, v in room.items() if solver.Value(v))
+            placements[sid] = {"day": ", ".join(p), "start_time": format_minutes(t),
+                               "end_time": format_minutes(t + dur), "room": r}
+            kept += current == (p, t, r)
+
+    scheduled = sum(1 for v in placements.values() if v)
+    stats = {
+        "status": solver.StatusName(status),
+        "sections": len(sections),
+        "scheduled": scheduled,
+        "unscheduled": [sid for sid, v in placements.items() if v is None],
+        "unchanged": kept,
+        "fixed": len(fixed),
+        "forecast_seats": demand_total,
+        "objective": solver.ObjectiveValue() if scheduled else 0,
+        "seconds": round(solver.WallTime(), 3),
+    }
+    return placements, stats
+
+
+def placed_sections(sections, placements) -> List[SectionRec]:
+    """Snapshot records of the sections that run, with their new slots (for validation)."""
+    out = []
+    for sec in sections:
+        p = placements.get(sec.id)
+        if p:
+            out.append(SectionRec(sec.id, sec.course_id, sec.code, p["day"], p["start_time"], p["end_time"],
+                                  p["room"], int(sec.capacity or 0), sec.faculty_id))
+    return out
+
+
+def timetable_term(sess, term: str = DEFAULT_TERM, apply: bool = False, **kwargs):
+    """
+    Timetable one term from the database, using predicted demand from prediction_engine.
+    apply: write the new day/time/room onto the Section rows (unscheduled sections are left as they are)
+    kwargs: passed to solve_timetable
+    Returns (placements, stats); stats["violations"] counts clashes/overloads left in the result.
+    """
+    from data_models import Faculty
+    from database import get_all_sections
+    from main_scheduler import predict_term_demand
+
+    sections = get_all_sections(sess, term)
+    if not sections:
+        raise ValueError(f"No sections found for term {term} — please seed your data first.")
+    faculty = sess.query(Faculty).all()
+    demand = predict_term_demand(sess, sections, term)
+    placements, stats = solve_timetable(sections, faculty, demand, **kwargs)
+    stats["violations"] = len(validate_timetable(placed_sections(sections, placements), faculty))
+
+    if apply:
+        for sec in sections:
+            p = placements.get(sec.id)
+            if p:
+                sec.day, sec.start_time, sec.end_time, sec.room = p["day"], p["start_time"], p["end_time"], p["room"]
+        sess.commit()
+    return placements, stats
+
+
+if __name__ == "__main__":
+    from data_models import Faculty
+    from database import SessionLocal, get_all_sections, init_db
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--term", default=DEFAULT_TERM)
+    ap.add_argument("--time-limit", type=float, default=10.0, help="CP-SAT budget (seconds)")
+    ap.add_argument("--fix-existing", action="store_true", help="only move unplaced or clashing sections")
+    ap.add_argument("--max-rooms", type=int, default=8, help="candidate rooms per section")
+    ap.add_argument("--apply", action="store_true", help="write the timetable to the database")
+    args = ap.parse_args()
+
+    init_db()
+    sess = SessionLocal()
+    try:
+        before = validate_timetable(get_all_sections(sess, args.term), sess.query(Faculty).all())
+        _placements, stats = timetable_term(sess, args.term, apply=args.apply, fix_existing=args.fix_existing,
+                                            max_rooms=args.max_rooms, time_limit=args.time_limit)
+    finally:
+        sess.close()
+    print(f"🗓️ Timetable {args.term}: {stats['status']} — {stats['scheduled']}/{stats['sections']} sections "
+          f"scheduled, {stats['unchanged']} unchanged, {stats['seconds']}s")
+    print(f"🔎 Violations: {len(before)} before → {stats['violations']} after")
+    if stats["unscheduled"]:
+        print(f"⚠️ Not scheduled (faculty load/availability or no slot): {stats['unscheduled']}")
+    print("✅ Applied to database." if args.apply else "ℹ️ Dry run — use --apply to save.")
@@ -1,15 +1,22 @@
 # train_from_csv.py
 """
-Train Random-Forest model from a CSV file.
+Train the demand model from a CSV file.
 CSV must have columns: semester, course_id, enrollment
+(optional: program, sections — used as features by the batch forecaster)
+
+How to run:
+    python train_from_csv.py --csv rf_history_from_combined.csv --model hgb
 """
 
+import argparse
 import pandas as pd
-from prediction_engine import train_rf
+from prediction_engine import train_rf, train_forecaster
 
-def train_from_csv(history_csv="data/history.csv", model_path="rf_demand.joblib"):
+def train_from_csv(history_csv="data/history.csv", model_path="rf_demand.joblib",
+                   model_type="legacy", n_jobs=-1):
     """
-    Reads historical course-enrollment data and trains the RF model.
+    Reads historical course-enrollment data and trains the demand model.
+    model_type: 'legacy' (one-hot semester/course RF), 'rf' or 'hgb' (batch forecaster)
     Saves model as rf_demand.joblib (or custom path).
     """
     df = pd.read_csv(history_csv)
@@ -19,9 +26,19 @@ def train_from_csv(history_csv="data/history.csv", model_path="rf_demand.joblib"
     if not required.issubset(df.columns):
         raise ValueError(f"CSV missing columns: {required - set(df.columns)}")
 
-    model = train_rf(df, model_path=model_path)
-    print(f"✅ Random-Forest model trained and saved to: {model_path}")
+    if model_type == "legacy":
+        model = train_rf(df, model_path=model_path, n_jobs=n_jobs)
+    else:
+        model = train_forecaster(df, model_type=model_type, n_jobs=n_jobs, model_path=model_path)
+    print(f"✅ Demand model ({model_type}) trained and saved to: {model_path}")
+    return model
 
 if __name__ == "__main__":
-    # Example run
-    train_from_csv("rf_history_from_combined.csv")
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--csv", default="rf_history_from_combined.csv")
+    ap.add_argument("--model-path", default="rf_demand.joblib")
+    ap.add_argument("--model", choices=["legacy", "rf", "hgb"], default="legacy")
+    ap.add_argument("--n-jobs", type=int, default=-1)
+    args = ap.parse_args()
+
+    train_from_csv(args.csv, model_path=args.model_path, model_type=args.model, n_jobs=args.n_jobs)
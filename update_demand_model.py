@@ -0,0 +1,178 @@
+# update_demand_model.py
+"""
+Incremental demand-model update from realized enrollments.
+
+After a term, each course's realized enrollment (students whose current seat
+in the term is an assigned section, split by their department as the program)
+is appended to the history CSV, tagged source=realized. Rerunning for a term
+replaces its earlier realized rows; recorded history for the term (rows not
+written by this tool) is never overwritten unless --replace is given.
+The saved model is then brought up to date:
+- the model's forecast for the term is scored against what was realized
+  (WAPE: sum |forecast - actual| / sum actual over the term's courses)
+- below the drift threshold, new_trees trees trained on the term's rows are
+  added to the forest (warm_start) — the old trees are kept, so the cost is
+  that of the new trees only
+- above it, or when the forest would exceed max_trees, or for models that
+  cannot be grown (hgb), the model is retrained from scratch on the full history
+
+How to run:
+    python update_demand_model.py --term Spring2025
+    python update_demand_model.py --term Fall2025 --new-trees 100 --drift 0.3 --full
+    python update_demand_model.py --term Spring2025 --replace   # overwrite recorded Spring2025 rows
+"""
+
+import argparse
+import os
+
+import pandas as pd
+from sqlalchemy import func
+
+from data_models import DEFAULT_TERM, Assignment, Course, Section, Student
+from database import get_all_sections, latest_assignment_ids
+from model_registry import DEFAULT_MODEL_PATH, get_model, save_model
+from prediction_engine import (
+    DemandForecaster, add_trees, catalog_from_sections, n_trees, predict_course_demand, train_forecaster, train_rf,
+)
+
+HISTORY_COLUMNS = ["semester", "program", "course_id", "enrollment", "source"]
+REALIZED = "realized"   # source tag of rows written by this tool
+DRIFT_THRESHOLD = 0.35   # WAPE above which the model is retrained from scratch
+NEW_TREES = 50
+MAX_TREES = 600          # prediction cost grows with the forest; retrain past this
+
+
+def realized_enrollment(sess, term=DEFAULT_TERM) -> pd.DataFrame:
+    """History rows (semester, program, course_id, enrollment) from the term's current seats."""
+    rows = (
+        sess.query(Section.course_id, Student.department, func.count())
+        .select_from(Assignment)
+        .join(Section, Section.id == Assignment.section_id)
+        .join(Student, Student.id == Assignment.student_id)
+        .filter(Assignment.id.in_(latest_assignment_ids(sess, term)), Assignment.status == "assigned")
+        .group_by(Section.course_id, Student.department)
+        .order_by(Section.course_id, Student.department)
+        .all()
+    )
+    return pd.DataFrame([(term, dept or "UNK", cid, n, REALIZED) for cid, dept, n in rows],
+                        columns=HISTORY_COLUMNS)
+
+
+def append_history(history_csv: str, realized: pd.DataFrame, term=DEFAULT_TERM, replace=False) -> pd.DataFrame:
+    """
+    Append the term's realized rows to the history CSV; returns the full history.
+    Earlier realized rows of the term are replaced. Recorded rows of the term
+    raise ValueError unless replace=True (then they are dropped too).
+    """
+    if os.path.exists(history_csv):
+        history = pd.read_csv(history_csv)
+        if "source" not in history.columns:
+            history["source"] = "recorded"
+        history["source"] = history["source"].fillna("recorded")
+        of_term = history["semester"] == term
+        recorded = of_term & (history["source"] != REALIZED)
+        if recorded.any() and not replace:
+            raise ValueError(f"{history_csv} already has {int(recorded.sum())} recorded rows for {term}; "
+                             f"pass replace=True (--replace) to overwrite them with realized enrollment.")
+        history = history[~of_term]
+    else:
+        history = pd.DataFrame(columns=HISTORY_COLUMNS)
+    history = pd.concat([history, realized], ignore_index=True)
+    history.to_csv(history_csv, index=False)
+    return history
+
+
+def forecast_error(model, sess, realized: pd.DataFrame, term=DEFAULT_TERM) -> float:
+    """WAPE of the model's per-course forecast for the term against realized enrollment."""
+    actual = realized.groupby("course_id")["enrollment"].sum()
+    if actual.sum() <= 0:
+        return 0.0
+    catalog = catalog_from_sections(get_all_sections(sess, term), sess.query(Course).all())
+    catalog = catalog[catalog["course_id"].isin(actual.index)]
+    forecast = predict_course_demand(model, term, catalog)
+    err = sum(abs(forecast.get(cid, 0.0) - n) for cid, n in actual.items())
+    return float(err / actual.sum())
+
+
+def _retrain(model, history: pd.DataFrame, model_path: str):
+    if isinstance(model, DemandForecaster):
+        return train_forecaster(history, model_type=model.model_type, n_jobs=model.n_jobs, model_path=model_path)
+    return train_rf(history, model_path=model_path)
+
+
+def update_demand_model(sess, term=DEFAULT_TERM, history_csv="rf_history_from_combined.csv",
+                        model_path=DEFAULT_MODEL_PATH, new_trees=NEW_TREES, drift=DRIFT_THRESHOLD,
+                        max_trees=MAX_TREES, full=False, replace=False) -> dict:
+    """
+    Feed the term's realized enrollment back into the history and the model.
+    full: retrain from scratch regardless of drift
+    replace: allow overwriting recorded history rows of the term
+    Returns {"term", "courses", "students", "error", "action", "trees"}.
+    """
+    realized = realized_enrollment(sess, term)
+    if realized.empty:
+        raise ValueError(f"No assigned students in {term} — nothing to learn from.")
+    history = append_history(history_csv, realized, term, replace)
+
+    try:
+        model = get_model(model_path)
+    except FileNotFoundError:
+        model, full = None, True
+
+    error = forecast_error(model, sess, realized, term) if model is not None else None
+    if full or error > drift:
+        action = "retrain"
+    elif n_trees(model) + new_trees > max_trees:
+        action = "retrain"
+    else:
+        try:
+            add_trees(model, history, term, new_trees)
+            action = "add_trees"
+        except ValueError:
+            action = "retrain"
+
+    if action == "retrain":
+        model = _retrain(model, history, model_path)
+    else:
+        save_model(model, model_path)
+    return {
+        "term": term,
+        "courses": int(realized["course_id"].nunique()),
+        "students": int(realized["enrollment"].sum()),
+        "error": None if error is None else round(error, 4),
+        "action": action,
+        "trees": n_trees(model),
+    }
+
+
+if __name__ == "__main__":
+    from database import SessionLocal, init_db
+
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--term", default=DEFAULT_TERM)
+    ap.add_argument("--csv", default="rf_history_from_combined.csv")
+    ap.add_argument("--model-path", default=DEFAULT_MODEL_PATH)
+    ap.add_argument("--new-trees", type=int, default=NEW_TREES)
+    ap.add_argument("--drift", type=float, default=DRIFT_THRESHOLD, help="WAPE above which to retrain fully")
+    ap.add_argument("--max-trees", type=int, default=MAX_TREES)
+    ap.add_argument("--full", action="store_true", help="retrain from scratch regardless of drift")
+    ap.add_argument("--replace", action="store_true", help="overwrite recorded history rows of the term")
+    args = ap.parse_args()
+
+    init_db()
+    sess = SessionLocal()
+    try:
+        report = update_demand_model(sess, args.term, args.csv, args.model_path, args.new_trees,
+                                     args.drift, args.max_trees, args.full, args.replace)
+    except ValueError as e:
+        raise SystemExit(f"❌ {e}")
+    finally:
+        sess.close()
+    err = "n/a" if report["error"] is None else f"{report['error']:.1%}"
+    print(f"📥 {report['term']}: {report['students']} students in {report['courses']} courses added to {args.csv}")
+    if report["action"] == "add_trees":
+        print(f"🌲 Forecast error {err} — added {args.new_trees} trees ({report['trees']} total)")
+    else:
+        trees = f" ({report['trees']} trees)" if report["trees"] else ""
+        print(f"🔁 Forecast error {err} — model retrained from scratch{trees}")
+    print(f"✅ Demand model saved to {args.model_path}")